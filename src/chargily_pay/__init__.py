@@ -1 +1,2 @@
-from .api import ChargilyClient
\ No newline at end of file
+from .api import ChargilyClient
+from .pool import ChargilyClientPool
@@ -1,37 +1,124 @@
+import asyncio
+import functools
 import hmac
 import hashlib
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager, nullcontext
 from dataclasses import asdict
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.compat import urljoin
 
 from .entity import Checkout, Customer, PaymentLink, Price, Product
-from .settings import CHARGILIY_URL
+from .idempotency import IdempotencyLayer, payload_key
+from .settings import (
+    CHARGILIY_URL,
+    DEFAULT_BALANCE_INTERVAL,
+    DEFAULT_HEDGE_MIN_SAMPLES,
+    DEFAULT_HEDGE_WORKERS,
+    DEFAULT_IDEMPOTENCY_TTL,
+    DEFAULT_POOL_MAXSIZE,
+    DEFAULT_WARMUP_CONNECTIONS,
+    DEFAULT_TIMEOUT,
+    STREAM_CHUNK_SIZE,
+)
+from .profiling import current_trace, span
+from .streaming import PageStream
+from .timeouts import Deadline, LatencyTracker
+from .watcher import BalanceWatcher
 
 
 # drop None values
 exclude_none_value = lambda x: {k: v for (k, v) in x if v is not None}
 
-asdict_true_value = lambda x: asdict(x, dict_factory=exclude_none_value)
+
+def asdict_true_value(x):
+    with span("serialize"):
+        return asdict(x, dict_factory=exclude_none_value)
+
+
+def json_or_exception(response: requests.Response):
+    if response.status_code == 422:
+        raise requests.exceptions.HTTPError(response, response=response)
+    response.raise_for_status()
+
+    with span("decode"):
+        return response.json()
 
 
 def response_or_exception(fn):
     from functools import wraps
 
     @wraps(fn)
-    def wrapper(*args, **kwargs):
-        response: requests.Response = fn(*args, **kwargs)
-        if response.status_code == 422:
-            raise requests.exceptions.HTTPError(response, response=response)
-        response.raise_for_status()
-
-        return response.json()
+    def wrapper(self, *args, **kwargs):
+        with self._trace():
+            response: requests.Response = fn(self, *args, **kwargs)
+            return json_or_exception(response)
 
     return wrapper
 
 
+def new_adapter(pool_maxsize: int = DEFAULT_POOL_MAXSIZE) -> HTTPAdapter:
+    """Adapter keeping up to `pool_maxsize` connections open per host"""
+    return HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+
+
+def new_session(
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE, adapter: HTTPAdapter = None
+) -> requests.Session:
+    """Session sending its requests through `adapter`, a new one by default.
+
+    Sessions mounting the same adapter share its connections but not their
+    cookies.
+    """
+    session = requests.Session()
+    if adapter is None:
+        adapter = new_adapter(pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# list method -> path, {} is the ID of the parent entity
+LIST_PATHS = {
+    "list_customers": "customers",
+    "list_products": "products",
+    "retrieve_product_prices": "products/{}/prices",
+    "list_prices": "prices",
+    "list_checkouts": "checkouts",
+    "retrieve_checkout_items": "checkouts/{}/items",
+    "list_payment_links": "payment-links",
+    "retrieve_payment_link_items": "payment-links/{}/items",
+}
+
+
+def endpoint_name(path: str) -> str:
+    """Collapse a request path to its endpoint, `checkouts/{id}/items` for example"""
+    segments = path.split("?", 1)[0].strip("/").split("/")
+    if len(segments) > 1:
+        segments[1] = "{id}"
+    return "/".join(segments)
+
+
 class ChargilyClient:
-    def __init__(self, key, secret, url=CHARGILIY_URL):
+    def __init__(
+        self,
+        key,
+        secret,
+        url=CHARGILIY_URL,
+        timeout=DEFAULT_TIMEOUT,
+        hedge_percentile=None,
+        hedge_min_samples=DEFAULT_HEDGE_MIN_SAMPLES,
+        idempotency_store=None,
+        idempotency_ttl=DEFAULT_IDEMPOTENCY_TTL,
+        session=None,
+        rate_limiter=None,
+        concurrency_limiter=None,
+        profiler=None,
+    ):
         self.key = key
         self.url = url
         self.secret = secret
@@ -39,66 +126,382 @@ class ChargilyClient:
             "Authorization": f"Bearer {self.secret}",
             "Content-Type": "application/json",
         }
+        # clients may share one session, and so its connection pool
+        self._owns_session = session is None
+        self.session = session if session is not None else new_session()
+        self.rate_limiter = rate_limiter
+        # an AdaptiveLimiter bounding the requests in flight
+        self.concurrency_limiter = concurrency_limiter
+        # a Profiler tracing a sample of the calls
+        self.profiler = profiler
+        # (connect, read) seconds, or a single number for both
+        self.timeout = timeout
+        # hedge GET requests slower than this latency percentile, None disables it
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = LatencyTracker()
+        self._local = threading.local()
+        self._hedge_executor = None
+        self._hedges_in_flight = 0
+        self._lock = threading.Lock()
+        self._balance_watcher = None
+        self._keepalive_stop = None
+        # deduplicate create_checkout calls, see IdempotencyLayer
+        self.idempotency_ttl = idempotency_ttl
+        self.idempotency = (
+            IdempotencyLayer(idempotency_store, idempotency_ttl)
+            if idempotency_store is not None
+            else None
+        )
+        # in-memory layer for explicit keys when no store is configured
+        self._explicit_layer = None
+        # clients sharing a store never see each other's keys
+        self._idempotency_namespace = hashlib.sha256(
+            (secret or "").encode("utf-8")
+        ).hexdigest()[:16]
+
+    # ==================================
+    # Requests
+    # ==================================
+
+    @contextmanager
+    def deadline(self, seconds):
+        """Bound every request made inside the block by one shared deadline"""
+        deadline = seconds if isinstance(seconds, Deadline) else Deadline(seconds)
+        previous = getattr(self._local, "deadline", None)
+        self._local.deadline = deadline
+        try:
+            yield deadline
+        finally:
+            self._local.deadline = previous
+
+    def close(self, wait: bool = True):
+        """Stop the background threads of the client.
+
+        A session the client created is closed too, a shared one is left
+        open for the other clients.
+        """
+        self.stop_keepalive()
+        with self._lock:
+            watcher, self._balance_watcher = self._balance_watcher, None
+            executor, self._hedge_executor = self._hedge_executor, None
+        if watcher is not None:
+            watcher.stop(wait=wait)
+        if executor is not None:
+            executor.shutdown(wait=wait)
+        if self._owns_session:
+            self.session.close()
+
+    def _trace(self):
+        return self.profiler.trace() if self.profiler is not None else nullcontext()
+
+    def _request(self, method, path, timeout=None, **kwargs):
+        trace = current_trace()
+        requested_at = time.monotonic()
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+        timeout = self.timeout if timeout is None else timeout
+        deadline = getattr(self._local, "deadline", None)
+        if deadline is not None:
+            timeout = deadline.timeout(timeout)
+
+        url = urljoin(self.url, path)
+        endpoint = endpoint_name(path)
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+
+        def send():
+            started = time.monotonic()
+            # only the first attempt of a hedged GET fills the trace
+            traced = trace is not None and trace.endpoint is None
+            if traced:
+                trace.endpoint, trace.method = endpoint, method
+                trace.add("queue", started - requested_at)
+                connections = self._connections(url)
+            response = self.session.request(
+                method, url, headers=headers, timeout=timeout, **kwargs
+            )
+            finished = time.monotonic()
+            self.latencies.observe(endpoint, finished - started)
+            if traced:
+                # elapsed stops at the headers, the body is read after it
+                ttfb = response.elapsed.total_seconds()
+                trace.status = response.status_code
+                if connections is not None:
+                    trace.connected = self._connections(url) > connections
+                trace.add("ttfb", ttfb)
+                if not kwargs.get("stream"):
+                    trace.add("receive", max(0.0, finished - started - ttfb))
+            return response
+
+        # a streamed loser would hold its connection until collected
+        hedge = self.hedge_percentile is not None and not kwargs.get("stream")
+        if method == "GET" and hedge:
+            call = lambda: self._hedged(endpoint, send)
+        else:
+            call = send
+
+        if self.concurrency_limiter is None:
+            return call()
+        with self.concurrency_limiter.slot() as slot:
+            slot.endpoint = endpoint
+            response = call()
+            slot.status_code = response.status_code
+            return response
+
+    def _connections(self, url):
+        """Connections opened so far by the pool of the API host, None when
+        the adapter mounted for it has no urllib3 pool"""
+        poolmanager = getattr(self.session.get_adapter(url), "poolmanager", None)
+        if poolmanager is None:
+            return None
+        return poolmanager.connection_from_url(url).num_connections
+
+    def _hedged(self, endpoint, send):
+        """Send a duplicate GET once the first one is slower than the percentile"""
+        if self.latencies.count(endpoint) < self.hedge_min_samples:
+            return send()
+        delay = self.latencies.percentile(endpoint, self.hedge_percentile)
+
+        first = self._submit_hedge(send)
+        if first is None:
+            # every hedge worker is busy, a duplicate would only add load
+            return send()
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        # the duplicate counts against the rate limit, never waits on it
+        second = None
+        if self.rate_limiter is None or self.rate_limiter.try_acquire():
+            second = self._submit_hedge(send)
+        pending = {first} if second is None else {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _submit_hedge(self, send):
+        """Run `send` on an idle hedge worker, None when they are all busy.
+
+        Attempts never wait in the executor queue, so the hedge delay only
+        counts the time spent on the request itself.
+        """
+        with self._lock:
+            if self._hedges_in_flight >= DEFAULT_HEDGE_WORKERS:
+                return None
+            self._hedges_in_flight += 1
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=DEFAULT_HEDGE_WORKERS,
+                    thread_name_prefix="chargily-hedge",
+                )
+            # close() may drop and shut it down from another thread
+            executor = self._hedge_executor
+
+        def attempt():
+            try:
+                return send()
+            finally:
+                self._hedge_done()
+
+        try:
+            return executor.submit(attempt)
+        except RuntimeError:
+            # shut down by close(), send without a hedge
+            self._hedge_done()
+            return None
+
+    def _hedge_done(self):
+        with self._lock:
+            self._hedges_in_flight -= 1
+
+    # ==================================
+    # Connections
+    # ==================================
+
+    def warmup(
+        self,
+        connections: int = DEFAULT_WARMUP_CONNECTIONS,
+        keepalive_interval: float = None,
+    ):
+        """Open pooled connections to the API ahead of the first request.
+
+        `connections` requests are sent at once so each opens (DNS, TCP and
+        TLS) its own connection, which goes back to the session pool for the
+        next requests. With `keepalive_interval`, the connections are pinged
+        in the background so the server doesn't close them while idle.
+        """
+        self._ping(connections)
+        if keepalive_interval is not None:
+            self._start_keepalive(connections, keepalive_interval)
+
+    async def awarmup(
+        self,
+        connections: int = DEFAULT_WARMUP_CONNECTIONS,
+        keepalive_interval: float = None,
+    ):
+        """`warmup` without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, functools.partial(self.warmup, connections, keepalive_interval)
+        )
+
+    def stop_keepalive(self):
+        if self._keepalive_stop is not None:
+            self._keepalive_stop.set()
+            self._keepalive_stop = None
+
+    def _ping(self, connections):
+        """Send light requests at once, one per pooled connection"""
+
+        def ping(_):
+            # any answer will do, the connection is what we are after
+            self.session.head(self.url, timeout=self.timeout).close()
+
+        with ThreadPoolExecutor(
+            max_workers=connections, thread_name_prefix="chargily-warmup"
+        ) as executor:
+            list(executor.map(ping, range(connections)))
+
+    def _start_keepalive(self, connections, interval):
+        self.stop_keepalive()
+        stop = self._keepalive_stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self._ping(connections)
+                except requests.exceptions.RequestException:
+                    # the next real request reconnects if needed
+                    pass
+
+        threading.Thread(target=run, name="chargily-keepalive", daemon=True).start()
+
+    def paginate(
+        self,
+        list_method,
+        *args,
+        per_page: int = 10,
+        deadline=None,
+        stream=False,
+        page: int = 1,
+    ):
+        """Iterate over the items of every page returned by a `list_*` method.
+
+        `deadline` (seconds or a `Deadline`) bounds the whole iteration, not
+        each page. With `stream`, items are decoded one at a time while the
+        page body arrives instead of after the whole page is read. Iteration
+        starts at `page`.
+        """
+        if deadline is not None and not isinstance(deadline, Deadline):
+            deadline = Deadline(deadline)
+        while True:
+            scope = self.deadline(deadline) if deadline is not None else nullcontext()
+            if stream:
+                with scope:
+                    response = self._request(
+                        "GET",
+                        f"{LIST_PATHS[list_method.__name__].format(*args)}?page={page}",
+                        params={"per_page": per_page},
+                        stream=True,
+                    )
+                if not response.ok:
+                    json_or_exception(response)
+                page_stream = PageStream(response.iter_content(STREAM_CHUNK_SIZE))
+                try:
+                    yield from page_stream
+                finally:
+                    response.close()
+                last_page = page_stream.meta.get("last_page")
+            else:
+                with scope:
+                    response = list_method(*args, per_page=per_page, page=page)
+                yield from response["data"]
+                last_page = response.get("last_page")
+            if page >= (last_page or page):
+                break
+            page += 1
 
     # ==================================
     # Balance
     # ==================================
 
-    def get_balance(self):
+    @response_or_exception
+    def get_balance(self, timeout=None):
         """Get your balance"""
-        response = requests.get(urljoin(self.url, "balance"), headers=self.headers)
+        response = self._request("GET", "balance", timeout=timeout)
 
-        return response.json()
+        return response
+
+    def watch_balance(self, interval: float = None):
+        """Return the balance watcher of this client, shared by every caller.
+
+        `interval` changes the polling interval of the shared watcher.
+        """
+        with self._lock:
+            if self._balance_watcher is None:
+                self._balance_watcher = BalanceWatcher(
+                    self, interval or DEFAULT_BALANCE_INTERVAL
+                )
+            elif interval is not None:
+                self._balance_watcher.interval = interval
+        return self._balance_watcher
 
     # ==================================
     # Customers
     # ==================================
     @response_or_exception
-    def create_customer(self, customer: Customer, *args, **kwargs):
+    def create_customer(self, customer: Customer, *args, timeout=None, **kwargs):
         """Create a customer"""
         customer_dict = asdict_true_value(customer)
-        response = requests.post(
-            urljoin(self.url, "customers"), headers=self.headers, json=customer_dict
+        response = self._request(
+            "POST",
+            "customers",
+            json=customer_dict,
+            timeout=timeout,
         )
         return response
 
     @response_or_exception
-    def update_customer(self, id, customer: Customer):
+    def update_customer(self, id, customer: Customer, timeout=None):
         """Update a customer"""
         customer_dict = asdict_true_value(customer)
-        response = requests.post(
-            urljoin(self.url, f"customers/{id}"),
-            headers=self.headers,
+        response = self._request(
+            "POST",
+            f"customers/{id}",
             json=customer_dict,
+            timeout=timeout,
         )
 
         return response
 
     @response_or_exception
-    def retrieve_customer(self, id):
+    def retrieve_customer(self, id, timeout=None):
         """Retrieve a customer"""
-        response = requests.get(
-            urljoin(self.url, f"customers/{id}"), headers=self.headers
-        )
+        response = self._request("GET", f"customers/{id}", timeout=timeout)
         return response
 
     @response_or_exception
-    def list_customers(self, per_page: int = 10, page: int = 1):
+    def list_customers(self, per_page: int = 10, page: int = 1, timeout=None):
         """List customers"""
-        response = requests.get(
-            urljoin(self.url, f"customers?page={page}"),
-            headers=self.headers,
+        response = self._request(
+            "GET",
+            f"customers?page={page}",
             params={"per_page": per_page},
+            timeout=timeout,
         )
 
         return response
 
     @response_or_exception
-    def delete_customer(self, id):
+    def delete_customer(self, id, timeout=None):
         """Delete a customer"""
-        response = requests.delete(
-            urljoin(self.url, f"customers/{id}"), headers=self.headers
-        )
+        response = self._request("DELETE", f"customers/{id}", timeout=timeout)
 
         return response
 
@@ -106,67 +509,69 @@ class ChargilyClient:
     # Products
     # ==================================
     @response_or_exception
-    def create_product(self, product: Product):
+    def create_product(self, product: Product, timeout=None):
         """Create a product"""
         product_dict = asdict_true_value(product)
 
-        response = requests.post(
-            urljoin(self.url, "products"),
-            headers=self.headers,
+        response = self._request(
+            "POST",
+            "products",
             json=product_dict,
+            timeout=timeout,
         )
 
         return response
 
     @response_or_exception
-    def update_product(self, id, product: Product):
+    def update_product(self, id, product: Product, timeout=None):
         """Update a product"""
         product_dict = asdict_true_value(product)
 
-        response = requests.post(
-            urljoin(self.url, f"products/{id}"),
-            headers=self.headers,
+        response = self._request(
+            "POST",
+            f"products/{id}",
             json=product_dict,
+            timeout=timeout,
         )
 
         return response
 
     @response_or_exception
-    def retrieve_product(self, id):
+    def retrieve_product(self, id, timeout=None):
         """Retrieve a product"""
-        response = requests.get(
-            urljoin(self.url, f"products/{id}"), headers=self.headers
-        )
+        response = self._request("GET", f"products/{id}", timeout=timeout)
 
         return response
 
     @response_or_exception
-    def list_products(self, per_page: int = 10, page: int = 1):
+    def list_products(self, per_page: int = 10, page: int = 1, timeout=None):
         """List products"""
-        response = requests.get(
-            urljoin(self.url, f"products?page={page}"),
-            headers=self.headers,
+        response = self._request(
+            "GET",
+            f"products?page={page}",
             params={"per_page": per_page},
+            timeout=timeout,
         )
 
         return response
 
-    def delete_product(self, id):
+    def delete_product(self, id, timeout=None):
         """Delete a product"""
-        response = requests.delete(
-            urljoin(self.url, f"products/{id}"), headers=self.headers
-        )
+        response = self._request("DELETE", f"products/{id}", timeout=timeout)
 
         return response
 
     # todo: retrieve product prices
     @response_or_exception
-    def retrieve_product_prices(self, id, per_page: int = 10, page: int = 1):
+    def retrieve_product_prices(
+        self, id, per_page: int = 10, page: int = 1, timeout=None
+    ):
         """Retrieve product prices"""
-        response = requests.get(
-            urljoin(self.url, f"products/{id}/prices?page={page}"),
-            headers=self.headers,
+        response = self._request(
+            "GET",
+            f"products/{id}/prices?page={page}",
             params={"per_page": per_page},
+            timeout=timeout,
         )
 
         return response
@@ -176,43 +581,41 @@ class ChargilyClient:
     # ==================================
 
     @response_or_exception
-    def create_price(self, price: Price):
+    def create_price(self, price: Price, timeout=None):
         """Create a price"""
         price_dict = asdict_true_value(price)
-        response = requests.post(
-            urljoin(self.url, "prices"),
-            headers=self.headers,
-            json=price_dict,
-        )
+        response = self._request("POST", "prices", json=price_dict, timeout=timeout)
 
         return response
 
     @response_or_exception
-    def update_price(self, id, metadata: list[dict]):
+    def update_price(self, id, metadata: list[dict], timeout=None):
         """Update a price"""
 
-        response = requests.post(
-            urljoin(self.url, f"prices/{id}"),
-            headers=self.headers,
+        response = self._request(
+            "POST",
+            f"prices/{id}",
             json={"metadata": metadata},
+            timeout=timeout,
         )
 
         return response
 
     @response_or_exception
-    def retrieve_price(self, id):
+    def retrieve_price(self, id, timeout=None):
         """Retrieve a price"""
-        response = requests.get(urljoin(self.url, f"prices/{id}"), headers=self.headers)
+        response = self._request("GET", f"prices/{id}", timeout=timeout)
 
         return response
 
     @response_or_exception
-    def list_prices(self, per_page: int = 10, page: int = 1):
+    def list_prices(self, per_page: int = 10, page: int = 1, timeout=None):
         """List prices"""
-        response = requests.get(
-            urljoin(self.url, f"prices?page={page}"),
-            headers=self.headers,
+        response = self._request(
+            "GET",
+            f"prices?page={page}",
             params={"per_page": per_page},
+            timeout=timeout,
         )
 
         return response
@@ -221,55 +624,83 @@ class ChargilyClient:
     # Checkouts
     # ==================================
 
-    @response_or_exception
-    def create_checkout(self, checkout: Checkout):
-        """Create a checkout"""
-        checkout_dict = asdict_true_value(checkout)
-        response = requests.post(
-            urljoin(self.url, "checkouts"),
-            headers=self.headers,
-            json=checkout_dict,
-        )
-
-        return response
+    def create_checkout(self, checkout: Checkout, timeout=None, idempotency_key=None):
+        """Create a checkout
+
+        With an idempotency store (or an explicit `idempotency_key`), repeated
+        calls for the same key within the TTL return the checkout created by
+        the first call.
+        """
+        with self._trace():
+            if isinstance(checkout, dict):
+                # already serialized, by build_checkouts for example
+                checkout_dict = checkout
+            else:
+                checkout_dict = asdict_true_value(checkout)
+
+            def create():
+                response = self._request(
+                    "POST",
+                    "checkouts",
+                    json=checkout_dict,
+                    timeout=timeout,
+                )
+                return json_or_exception(response)
+
+            layer = self.idempotency
+            if idempotency_key is None:
+                if layer is None:
+                    return create()
+                idempotency_key = payload_key(checkout_dict)
+            elif layer is None:
+                # explicit keys alone never turn on payload deduplication
+                layer = self._explicit_idempotency()
+            key = f"{self._idempotency_namespace}:checkouts:{idempotency_key}"
+            return layer.run(key, create)
+
+    def _explicit_idempotency(self) -> IdempotencyLayer:
+        with self._lock:
+            if self._explicit_layer is None:
+                self._explicit_layer = IdempotencyLayer(ttl=self.idempotency_ttl)
+            return self._explicit_layer
 
     @response_or_exception
-    def retrieve_checkout(self, id):
+    def retrieve_checkout(self, id, timeout=None):
         """Retrieve a checkout"""
-        response = requests.get(
-            urljoin(self.url, f"checkouts/{id}"), headers=self.headers
-        )
+        response = self._request("GET", f"checkouts/{id}", timeout=timeout)
 
         return response
 
     @response_or_exception
-    def list_checkouts(self, per_page: int = 10, page: int = 1):
+    def list_checkouts(self, per_page: int = 10, page: int = 1, timeout=None):
         """List checkouts"""
-        response = requests.get(
-            urljoin(self.url, f"checkouts?page={page}"),
-            headers=self.headers,
+        response = self._request(
+            "GET",
+            f"checkouts?page={page}",
             params={"per_page": per_page},
+            timeout=timeout,
         )
 
         return response
 
     @response_or_exception
-    def retrieve_checkout_items(self, id, per_page: int = 10, page: int = 1):
+    def retrieve_checkout_items(
+        self, id, per_page: int = 10, page: int = 1, timeout=None
+    ):
         """List checkouts items"""
-        response = requests.get(
-            urljoin(self.url, f"checkouts/{id}/items?page={page}"),
-            headers=self.headers,
+        response = self._request(
+            "GET",
+            f"checkouts/{id}/items?page={page}",
             params={"per_page": per_page},
+            timeout=timeout,
         )
 
         return response
 
     @response_or_exception
-    def expire_checkout(self, id):
+    def expire_checkout(self, id, timeout=None):
         """Expire a checkout"""
-        response = requests.post(
-            urljoin(self.url, f"checkouts/{id}/expire"), headers=self.headers
-        )
+        response = self._request("POST", f"checkouts/{id}/expire", timeout=timeout)
 
         return response
 
@@ -277,56 +708,63 @@ class ChargilyClient:
     # Payment Links
     # ==================================
     @response_or_exception
-    def create_payment_link(self, payment_link: PaymentLink):
+    def create_payment_link(self, payment_link: PaymentLink, timeout=None):
         """Create a payment link"""
-        payment_link_dict = asdict_true_value(payment_link)
-        response = requests.post(
-            urljoin(self.url, "payment-links"),
-            headers=self.headers,
+        if isinstance(payment_link, dict):
+            payment_link_dict = payment_link
+        else:
+            payment_link_dict = asdict_true_value(payment_link)
+        response = self._request(
+            "POST",
+            "payment-links",
             json=payment_link_dict,
+            timeout=timeout,
         )
 
         return response
 
     @response_or_exception
-    def update_payment_link(self, id, payment_link: PaymentLink):
+    def update_payment_link(self, id, payment_link: PaymentLink, timeout=None):
         """Update a payment link"""
         payment_link_dict = asdict_true_value(payment_link)
-        response = requests.post(
-            urljoin(self.url, f"payment-links/{id}"),
-            headers=self.headers,
+        response = self._request(
+            "POST",
+            f"payment-links/{id}",
             json=payment_link_dict,
+            timeout=timeout,
         )
 
         return response
 
     @response_or_exception
-    def retrieve_payment_link(self, id):
+    def retrieve_payment_link(self, id, timeout=None):
         """Retrieve a payment link"""
-        response = requests.get(
-            urljoin(self.url, f"payment-links/{id}"), headers=self.headers
-        )
+        response = self._request("GET", f"payment-links/{id}", timeout=timeout)
 
         return response
 
     @response_or_exception
-    def list_payment_links(self, per_page: int = 10, page: int = 1):
+    def list_payment_links(self, per_page: int = 10, page: int = 1, timeout=None):
         """List payment links"""
-        response = requests.get(
-            urljoin(self.url, f"payment-links?page={page}"),
-            headers=self.headers,
+        response = self._request(
+            "GET",
+            f"payment-links?page={page}",
             params={"per_page": per_page},
+            timeout=timeout,
         )
 
         return response
 
     @response_or_exception
-    def retrieve_payment_link_items(self, id, per_page: int = 10, page: int = 1):
+    def retrieve_payment_link_items(
+        self, id, per_page: int = 10, page: int = 1, timeout=None
+    ):
         """List payment link items"""
-        response = requests.get(
-            urljoin(self.url, f"payment-links/{id}/items?page={page}"),
-            headers=self.headers,
+        response = self._request(
+            "GET",
+            f"payment-links/{id}/items?page={page}",
             params={"per_page": per_page},
+            timeout=timeout,
         )
 
         return response
@@ -0,0 +1,214 @@
+from dataclasses import fields, is_dataclass
+
+from .api import asdict_true_value
+from .entity import (
+    AMOUNT_TOO_LOW,
+    CURRENCY_REQUIRED,
+    ITEMS_OR_AMOUNT_REQUIRED,
+    MIN_AMOUNT,
+    Checkout,
+    PaymentLink,
+)
+
+SUCCESS_URL_REQUIRED = "success_url must be provided"
+NAME_REQUIRED = "name must be provided"
+ITEMS_REQUIRED = "items must be provided"
+AMOUNT_NOT_INTEGER = "amount must be an integer"
+
+
+class BatchResult:
+    """Serialized payloads of the valid rows and the errors of the others"""
+
+    def __init__(self, size: int):
+        self.size = size
+        # row -> error messages
+        self.errors = {}
+        self.payloads = []
+        # row of each payload
+        self.rows = []
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def add_error(self, row: int, message: str):
+        self.errors.setdefault(row, []).append(message)
+
+    def report(self) -> list:
+        """Return `(row, message)` for every error, ordered by row"""
+        return [(row, m) for row in sorted(self.errors) for m in self.errors[row]]
+
+
+# fields whose value is itself a list
+LIST_FIELDS = {"items", "metadata"}
+
+
+def _is_column(name, value) -> bool:
+    if hasattr(value, "dtype"):
+        return True
+    if not isinstance(value, (list, tuple)):
+        return False
+    if name not in LIST_FIELDS:
+        return True
+    # a column of lists, a list of dicts or items is one shared value
+    return bool(value) and all(v is None or isinstance(v, (list, tuple)) for v in value)
+
+
+def _columns(entity, values: dict):
+    """Broadcast scalars and check that every column has the same length"""
+    sizes = {len(v) for k, v in values.items() if _is_column(k, v)}
+    if len(sizes) > 1:
+        raise ValueError(f"columns must have the same length, got {sorted(sizes)}")
+    size = sizes.pop() if sizes else 1
+
+    columns = {}
+    for f in fields(entity):
+        value = values.get(f.name)
+        if hasattr(value, "dtype"):
+            # numpy arrays, tolist() gives JSON serializable python values
+            value = value.tolist()
+        is_column = _is_column(f.name, value)
+        columns[f.name] = list(value) if is_column else [value] * size
+    return size, columns
+
+
+def _serialize(value):
+    if is_dataclass(value):
+        return asdict_true_value(value)
+    if isinstance(value, (list, tuple)):
+        return [_serialize(v) for v in value]
+    return value
+
+
+def _payloads(result: BatchResult, columns: dict, defaults: dict):
+    names = list(columns)
+    for row, values in enumerate(zip(*columns.values())):
+        if row in result.errors:
+            continue
+        payload = {}
+        for name, value in zip(names, values):
+            if value is None:
+                value = defaults.get(name)
+            if value is not None:
+                payload[name] = _serialize(value)
+        result.payloads.append(payload)
+        result.rows.append(row)
+
+
+def _amount_masks(amounts):
+    """Rows with an amount, with an amount too low and with an amount that
+    isn't an integer, in one pass"""
+    if hasattr(amounts, "dtype") and amounts.dtype.kind in "iuf":
+        import numpy as np
+
+        present = amounts != 0
+        invalid = np.zeros(len(amounts), dtype=bool)
+        if amounts.dtype.kind == "f":
+            present &= ~np.isnan(amounts)
+            invalid = present & (np.mod(amounts, 1) != 0)
+        too_low = present & ~invalid & (amounts <= MIN_AMOUNT)
+        return present.tolist(), too_low.tolist(), invalid.tolist()
+
+    # object arrays (None from pandas, strings from CSV) are checked per row
+    if hasattr(amounts, "dtype"):
+        amounts = amounts.tolist()
+    present, too_low, invalid = [], [], []
+    for a in amounts:
+        # NaN != NaN
+        missing = a is None or a != a or (_is_number(a) and a == 0)
+        bad = not missing and not (_is_number(a) and float(a).is_integer())
+        present.append(not missing)
+        invalid.append(bad)
+        too_low.append(not missing and not bad and a <= MIN_AMOUNT)
+    return present, too_low, invalid
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def build_checkouts(
+    success_url,
+    items=None,
+    amount=None,
+    currency=None,
+    failure_url=None,
+    customer_id=None,
+    description=None,
+    locale=None,
+    payment_method=None,
+    webhook_endpoint=None,
+    pass_fees_to_customer=None,
+    metadata=None,
+) -> BatchResult:
+    """Validate and serialize many checkouts given as columns.
+
+    Every argument is either a column (list, tuple or NumPy array) with one
+    value per checkout or a single value shared by all of them. `items` and
+    `metadata` are columns when they hold one list per checkout, a single
+    list of items or dicts is shared. Rows are checked with the rules of
+    `Checkout`; invalid rows are reported in `errors` instead of raising.
+    The amount checks run on whole numeric NumPy arrays, the others row by
+    row.
+    """
+    size, columns = _columns(Checkout, locals())
+    result = BatchResult(size)
+
+    if amount is not None and hasattr(amount, "dtype"):
+        has_amount, too_low, not_integer = _amount_masks(amount)
+    else:
+        has_amount, too_low, not_integer = _amount_masks(columns["amount"])
+
+    for row, url in enumerate(columns["success_url"]):
+        if not url:
+            result.add_error(row, SUCCESS_URL_REQUIRED)
+    for row, (row_items, present) in enumerate(zip(columns["items"], has_amount)):
+        if not row_items and not present:
+            result.add_error(row, ITEMS_OR_AMOUNT_REQUIRED)
+    for row, bad in enumerate(not_integer):
+        if bad:
+            result.add_error(row, AMOUNT_NOT_INTEGER)
+    for row, low in enumerate(too_low):
+        if low:
+            result.add_error(row, AMOUNT_TOO_LOW)
+    for row, (present, row_currency) in enumerate(zip(has_amount, columns["currency"])):
+        if present and not row_currency:
+            result.add_error(row, CURRENCY_REQUIRED)
+
+    # missing (None or NaN) amounts are left out, the others sent as integers
+    columns["amount"] = [
+        int(a) if present and not bad else None
+        for a, present, bad in zip(columns["amount"], has_amount, not_integer)
+    ]
+
+    _payloads(result, columns, defaults={"metadata": []})
+    return result
+
+
+def build_payment_links(
+    name,
+    items,
+    after_completion_message=None,
+    locale=None,
+    pass_fees_to_customer=None,
+    metadata=None,
+) -> BatchResult:
+    """Validate and serialize many payment links given as columns.
+
+    Arguments follow the same rules as `build_checkouts`.
+    """
+    size, columns = _columns(PaymentLink, locals())
+    result = BatchResult(size)
+
+    for row, row_name in enumerate(columns["name"]):
+        if not row_name:
+            result.add_error(row, NAME_REQUIRED)
+    for row, row_items in enumerate(columns["items"]):
+        if not row_items:
+            result.add_error(row, ITEMS_REQUIRED)
+
+    _payloads(result, columns, defaults={})
+    return result
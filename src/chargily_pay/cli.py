@@ -0,0 +1,379 @@
+"""Bulk jobs against the Chargily Pay API.
+
+chargily-pay import customers customers.jsonl --concurrency 8
+chargily-pay --output checkouts.csv export checkouts --format csv
+chargily-pay replay-webhooks webhooks.jsonl
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .api import ChargilyClient
+from .entity import Address, Customer, Price, Product
+from .profiling import load, report, trace_files
+from .ratelimit import RateLimiter
+from .settings import CHARGILIY_TEST_URL, CHARGILIY_URL
+
+# resource -> (entity, create method)
+IMPORTS = {
+    "customers": (Customer, "create_customer"),
+    "products": (Product, "create_product"),
+    "prices": (Price, "create_price"),
+}
+
+# resource -> list method
+EXPORTS = {
+    "customers": "list_customers",
+    "products": "list_products",
+    "prices": "list_prices",
+    "checkouts": "list_checkouts",
+    "payment-links": "list_payment_links",
+}
+
+
+class Progress:
+    """Done/error counters and throughput, printed at most twice a second"""
+
+    def __init__(self, stream=sys.stderr, interval: float = 0.5):
+        self.stream = stream
+        self.interval = interval
+        self.done = 0
+        self.errors = 0
+        self.started_at = time.monotonic()
+        self._printed_at = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, error: bool = False):
+        with self._lock:
+            self.done += 1
+            self.errors += error
+            now = time.monotonic()
+            if now - self._printed_at >= self.interval:
+                self._printed_at = now
+                self._print("\r")
+
+    def finish(self):
+        self._print("\r")
+        self.stream.write("\n")
+
+    def _print(self, prefix):
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        self.stream.write(
+            f"{prefix}{self.done} done, {self.errors} errors, "
+            f"{self.done / elapsed:.1f}/s"
+        )
+        self.stream.flush()
+
+
+class Checkpoint:
+    """Rows already processed, appended to a file to resume an interrupted job.
+
+    A row may be recorded with the output offset reached after it, lines are
+    `row` or `row offset`.
+    """
+
+    def __init__(self, path):
+        self.done = set()
+        # row -> output offset
+        self.offsets = {}
+        self._file = None
+        self._lock = threading.Lock()
+        if path is None:
+            return
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        row, *offset = map(int, line.split())
+                        self.done.add(row)
+                        if offset:
+                            self.offsets[row] = offset[0]
+        self._file = open(path, "a", encoding="utf-8")
+
+    def add(self, row: int, offset: int = None):
+        if self._file is None:
+            return
+        with self._lock:
+            self._file.write(f"{row}\n" if offset is None else f"{row} {offset}\n")
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def read_rows(path, format=None, decode_cells=True):
+    """Yield dicts from a JSONL or CSV file, JSON values of CSV cells decoded"""
+    format = format or ("csv" if path.endswith(".csv") else "jsonl")
+    with open(path, encoding="utf-8", newline="") as f:
+        if format == "jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        for row in csv.DictReader(f):
+            if decode_cells:
+                row = {k: _decode_cell(v) for k, v in row.items() if v != ""}
+            yield row
+
+
+def _decode_cell(value: str):
+    if value[:1] in "[{":
+        return json.loads(value)
+    return value
+
+
+def to_entity(entity, row: dict):
+    if entity is Customer and isinstance(row.get("address"), dict):
+        row = {**row, "address": Address(**row["address"])}
+    if entity is Price:
+        row = {**row, "amount": int(row["amount"])}
+    return entity(**row)
+
+
+def run_bounded(fn, items, concurrency: int):
+    """Yield `(item, result, error)` with at most `concurrency` calls in flight"""
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="chargily-cli"
+    ) as executor:
+        pending = {}
+
+        def drain(return_when):
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                item = pending.pop(future)
+                error = future.exception()
+                yield item, None if error else future.result(), error
+
+        for item in items:
+            if len(pending) >= concurrency:
+                yield from drain(FIRST_COMPLETED)
+            pending[executor.submit(fn, item)] = item
+        while pending:
+            yield from drain(FIRST_COMPLETED)
+
+
+def _appending(output) -> bool:
+    return output.seekable() and output.tell() > 0
+
+
+def _csv_header(output) -> list:
+    """Columns of the CSV file an export appends to"""
+    with open(output.name, encoding="utf-8", newline="") as f:
+        return next(csv.reader(f), None)
+
+
+def _error_message(error):
+    response = getattr(error, "response", None)
+    if response is not None:
+        return f"{response.status_code} {response.text}"
+    return str(error)
+
+
+# ==================================
+# Commands
+# ==================================
+
+
+def import_command(client: ChargilyClient, args, output):
+    entity, method = IMPORTS[args.resource]
+    create = getattr(client, method)
+    checkpoint = Checkpoint(args.checkpoint)
+    progress = Progress()
+
+    rows = (
+        (row, data)
+        for row, data in enumerate(read_rows(args.file, args.format))
+        if row not in checkpoint.done
+    )
+
+    def send(item):
+        return create(to_entity(entity, item[1]))
+
+    try:
+        for (row, _), result, error in run_bounded(send, rows, args.concurrency):
+            if error is None:
+                record = {"row": row, "id": result.get("id")}
+                checkpoint.add(row)
+            else:
+                record = {"row": row, "error": _error_message(error)}
+            output.write(json.dumps(record) + "\n")
+            progress.update(error is not None)
+    finally:
+        checkpoint.close()
+        progress.finish()
+    return 1 if progress.errors else 0
+
+
+def export_command(client: ChargilyClient, args, output):
+    list_method = getattr(client, EXPORTS[args.resource])
+    checkpoint = Checkpoint(args.checkpoint)
+    progress = Progress()
+
+    page = args.start_page
+    if args.checkpoint is not None:
+        if checkpoint.done:
+            # drop what was written of the page after the last complete one
+            page = max(checkpoint.done)
+            output.seek(checkpoint.offsets[page])
+            output.truncate()
+            page += 1
+        else:
+            checkpoint.add(page - 1, output.tell())
+    items = client.paginate(list_method, per_page=args.per_page, stream=True, page=page)
+
+    def end_page():
+        output.flush()
+        checkpoint.add(page, output.tell())
+
+    writer = None
+    written = 0
+    try:
+        for item in items:
+            if args.format == "csv":
+                if writer is None:
+                    # a resumed export appends to a file that has its header
+                    appending = _appending(output)
+                    writer = csv.DictWriter(
+                        output,
+                        fieldnames=_csv_header(output) if appending else list(item),
+                        extrasaction="ignore",
+                    )
+                    if not appending:
+                        writer.writeheader()
+                writer.writerow(
+                    {
+                        k: json.dumps(v) if isinstance(v, (dict, list)) else v
+                        for k, v in item.items()
+                    }
+                )
+            else:
+                output.write(json.dumps(item) + "\n")
+            progress.update()
+            written += 1
+            # every page but the last one is full
+            if written % args.per_page == 0:
+                end_page()
+                page += 1
+        if written % args.per_page:
+            end_page()
+    finally:
+        checkpoint.close()
+        progress.finish()
+    return 0
+
+
+def replay_webhooks_command(client: ChargilyClient, args, output):
+    """Verify the signatures of dumped webhooks, `{"signature", "payload"}` rows.
+
+    `payload` should be the raw request body, a decoded object is dumped back
+    to JSON which only matches the signature if the body was compact.
+    """
+    progress = Progress()
+    rows = read_rows(args.file, args.format, decode_cells=False)
+    for row, data in enumerate(rows):
+        payload = data["payload"]
+        if not isinstance(payload, str):
+            payload = json.dumps(payload, separators=(",", ":"))
+        valid = client.validate_signature(data["signature"], payload)
+        if not valid:
+            output.write(json.dumps({"row": row, "error": "invalid signature"}) + "\n")
+        progress.update(not valid)
+    progress.finish()
+    return 1 if progress.errors else 0
+
+
+def profile_report_command(client, args, output):
+    """Print per-endpoint span percentiles of a Profiler trace file"""
+    output.write(report(load(trace_files(args.file)), args.percentiles) + "\n")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="chargily-pay", description="Bulk jobs against the Chargily Pay API"
+    )
+    parser.add_argument(
+        "--key",
+        default=os.getenv("CHARGILY_KEY"),
+        help="API public key (default: $CHARGILY_KEY)",
+    )
+    parser.add_argument(
+        "--secret",
+        default=os.getenv("CHARGILY_SECRET"),
+        help="API secret key (default: $CHARGILY_SECRET)",
+    )
+    parser.add_argument("--url", help=f"API base URL (default: {CHARGILIY_URL})")
+    parser.add_argument("--test", action="store_true", help=f"use {CHARGILIY_TEST_URL}")
+    parser.add_argument("--rate-limit", type=float, help="maximum requests per second")
+    parser.add_argument("--output", help="output file (default: stdout)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="create entities from a file")
+    importer.add_argument("resource", choices=sorted(IMPORTS))
+    importer.add_argument("file", help="JSONL or CSV file, one entity per row")
+    importer.add_argument("--format", choices=["jsonl", "csv"])
+    importer.add_argument("--concurrency", type=int, default=4)
+    importer.add_argument(
+        "--checkpoint", help="file of created rows, skipped when the job is resumed"
+    )
+    importer.set_defaults(handler=import_command)
+
+    exporter = commands.add_parser("export", help="write a collection to a file")
+    exporter.add_argument("resource", choices=sorted(EXPORTS))
+    exporter.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    exporter.add_argument("--per-page", type=int, default=100)
+    exporter.add_argument(
+        "--start-page", type=int, default=1, help="resume an export from this page"
+    )
+    exporter.add_argument(
+        "--checkpoint", help="file of written pages, the job resumes after them"
+    )
+    exporter.set_defaults(handler=export_command)
+
+    replay = commands.add_parser(
+        "replay-webhooks", help="verify the signatures of dumped webhooks"
+    )
+    replay.add_argument("file", help='JSONL or CSV file of "signature" and "payload"')
+    replay.add_argument("--format", choices=["jsonl", "csv"])
+    replay.set_defaults(handler=replay_webhooks_command)
+
+    profile = commands.add_parser(
+        "profile-report", help="span percentiles (ms) of a profiler trace file"
+    )
+    profile.add_argument("file", help="trace file, rotated backups are included")
+    profile.add_argument("--percentiles", type=float, nargs="+", default=[50, 90, 99])
+    profile.set_defaults(handler=profile_report_command, offline=True)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    client = None
+    if not getattr(args, "offline", False):
+        if not args.secret:
+            sys.exit("chargily-pay: --secret or $CHARGILY_SECRET is required")
+        url = args.url or (CHARGILIY_TEST_URL if args.test else CHARGILIY_URL)
+        rate_limiter = RateLimiter(args.rate_limit) if args.rate_limit else None
+        client = ChargilyClient(
+            args.key, args.secret, url=url, rate_limiter=rate_limiter
+        )
+
+    if args.output is None:
+        return args.handler(client, args, sys.stdout)
+    # a resumed job appends to the output of the interrupted one
+    resumed = getattr(args, "checkpoint", None) or getattr(args, "start_page", 1) > 1
+    with open(
+        args.output, "a" if resumed else "w", encoding="utf-8", newline=""
+    ) as output:
+        return args.handler(client, args, output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
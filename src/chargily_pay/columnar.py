@@ -0,0 +1,266 @@
+from array import array
+from datetime import datetime
+
+# column kind -> array typecode, kinds without one are kept in lists
+TYPECODES = {
+    "int": "q",
+    "float": "d",
+    "bool": "b",
+    "timestamp": "q",
+    "category": "i",
+}
+
+CHECKOUT_COLUMNS = {
+    "id": "str",
+    "livemode": "bool",
+    "amount": "int",
+    "fees": "int",
+    "currency": "category",
+    "status": "category",
+    "payment_method": "category",
+    "locale": "category",
+    "pass_fees_to_customer": "bool",
+    "customer_id": "str",
+    "payment_link_id": "str",
+    "invoice_id": "str",
+    "description": "str",
+    "created_at": "timestamp",
+    "updated_at": "timestamp",
+}
+
+PRICE_COLUMNS = {
+    "id": "str",
+    "livemode": "bool",
+    "amount": "int",
+    "currency": "category",
+    "product_id": "str",
+    "created_at": "timestamp",
+    "updated_at": "timestamp",
+}
+
+
+def infer_kind(name, value):
+    if name == "status" or name == "currency":
+        return "category"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "timestamp" if name.endswith("_at") else "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "str"
+    return "object"
+
+
+def to_timestamp(value):
+    if isinstance(value, str):
+        return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+    return int(value)
+
+
+class _Column:
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        typecode = TYPECODES.get(kind)
+        self.values = array(typecode) if typecode else []
+        # 1 when the row has a value
+        self.valid = bytearray()
+        self.categories = []
+        self._codes = {}
+
+    def convert(self, value):
+        """Return the value to store, ValueError when it doesn't fit the kind"""
+        if value is None:
+            return None
+        try:
+            if self.kind == "timestamp":
+                value = to_timestamp(value)
+            elif self.kind == "int":
+                # JSON numbers like 1000.0 are integers too
+                if isinstance(value, float) and value.is_integer():
+                    value = int(value)
+                if not isinstance(value, int):
+                    raise TypeError
+            elif self.kind == "float":
+                if not isinstance(value, (int, float)):
+                    raise TypeError
+                value = float(value)
+            elif self.kind == "bool":
+                if value not in (True, False):
+                    raise TypeError
+                value = int(value)
+            if self.kind in ("int", "timestamp") and not -(2**63) <= value < 2**63:
+                raise TypeError
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(
+                f"column {self.name!r} expects {self.kind} values, got {value!r}"
+            ) from None
+        return value
+
+    def append(self, value):
+        """Append a value returned by `convert`"""
+        if value is None:
+            self.valid.append(0)
+            if self.kind == "category":
+                self.values.append(-1)
+            else:
+                self.values.append(None if isinstance(self.values, list) else 0)
+            return
+        self.valid.append(1)
+        if self.kind == "category":
+            code = self._codes.get(value)
+            if code is None:
+                code = self._codes[value] = len(self.categories)
+                self.categories.append(value)
+            self.values.append(code)
+        else:
+            self.values.append(value)
+
+    @property
+    def has_nulls(self) -> bool:
+        return 0 in self.valid
+
+
+class ColumnarResult:
+    """Items of `list_*` responses stored as one typed array per column.
+
+    Items are appended column by column as pages arrive, so no list of dicts
+    is kept. `schema` maps each column to a kind (`int`, `float`, `bool`,
+    `timestamp`, `category`, `str` or `object`); when it is None the columns
+    are inferred from the first item. Keys outside the schema are ignored.
+    """
+
+    def __init__(self, schema: dict = None):
+        self.schema = dict(schema) if schema is not None else None
+        self._columns = None
+        self._rows = 0
+        if self.schema is not None:
+            self._create_columns()
+
+    @classmethod
+    def from_items(cls, items, schema: dict = None):
+        """Collect items, from `ChargilyClient.paginate` for example"""
+        result = cls(schema)
+        result.extend(items)
+        return result
+
+    def __len__(self):
+        return self._rows
+
+    @property
+    def columns(self) -> list:
+        return list(self.schema or ())
+
+    def add_page(self, response: dict):
+        """Append the `data` of a `list_*` response"""
+        self.extend(response["data"])
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def append(self, item: dict):
+        if self._columns is None:
+            self.schema = {name: infer_kind(name, v) for name, v in item.items()}
+            self._create_columns()
+        # convert the whole row first, so a bad value leaves no column longer
+        values = [
+            column.convert(item.get(name)) for name, column in self._columns.items()
+        ]
+        for column, value in zip(self._columns.values(), values):
+            column.append(value)
+        self._rows += 1
+
+    def _create_columns(self):
+        self._columns = {
+            name: _Column(name, kind) for name, kind in self.schema.items()
+        }
+
+    # ==================================
+    # Export
+    # ==================================
+
+    def to_numpy(self) -> dict:
+        """Return a dict of NumPy arrays, masked arrays for columns with nulls"""
+        import numpy as np
+
+        arrays = {}
+        for name, column in (self._columns or {}).items():
+            values = self._numpy_values(np, column)
+            if column.has_nulls and column.kind in ("int", "float", "bool"):
+                mask = np.frombuffer(column.valid, dtype=np.uint8) == 0
+                values = np.ma.masked_array(values, mask=mask)
+            arrays[name] = values
+        return arrays
+
+    def to_pandas(self):
+        """Return a `pandas.DataFrame`, categories as `Categorical`"""
+        import numpy as np
+        import pandas as pd
+
+        data = {}
+        for name, column in (self._columns or {}).items():
+            values = self._numpy_values(np, column, categories_as_codes=True)
+            mask = np.frombuffer(column.valid, dtype=np.uint8) == 0
+            if column.kind == "category":
+                values = pd.Categorical.from_codes(values, column.categories)
+            elif column.kind == "int" and column.has_nulls:
+                values = pd.arrays.IntegerArray(values, mask)
+            elif column.kind == "float" and column.has_nulls:
+                values[mask] = np.nan
+            elif column.kind == "bool" and column.has_nulls:
+                values = pd.arrays.BooleanArray(values, mask)
+            data[name] = values
+        return pd.DataFrame(data, columns=self.columns)
+
+    def to_arrow(self):
+        """Return a `pyarrow.Table`, categories as dictionary arrays"""
+        import numpy as np
+        import pyarrow as pa
+
+        arrays = {}
+        for name, column in (self._columns or {}).items():
+            if column.kind == "str":
+                arrays[name] = pa.array(column.values, type=pa.string())
+                continue
+            if column.kind == "object":
+                arrays[name] = pa.array(column.values)
+                continue
+            values = self._numpy_values(np, column, categories_as_codes=True)
+            mask = np.frombuffer(column.valid, dtype=np.uint8) == 0
+            if column.kind == "category":
+                arrays[name] = pa.DictionaryArray.from_arrays(
+                    pa.array(values, mask=mask),
+                    pa.array(column.categories, type=pa.string()),
+                )
+            else:
+                arrays[name] = pa.array(values, mask=mask)
+        return pa.table(arrays)
+
+    @staticmethod
+    def _numpy_values(np, column: _Column, categories_as_codes=False):
+        kind = column.kind
+        if kind in ("str", "object"):
+            values = np.empty(len(column.values), dtype=object)
+            values[:] = column.values
+            return values
+
+        dtype = {"int": np.int64, "float": np.float64, "bool": np.int8}
+        dtype.update(timestamp=np.int64, category=np.int32)
+        # copy, a view would lock the array against further appends
+        values = np.frombuffer(column.values, dtype=dtype[kind]).copy()
+        if kind == "bool":
+            return values.astype(bool)
+        if kind == "timestamp":
+            values = values.astype("datetime64[s]")
+            missing = np.frombuffer(column.valid, dtype=np.uint8) == 0
+            values[missing] = np.datetime64("NaT")
+            return values
+        if kind == "category" and not categories_as_codes:
+            categories = np.empty(len(column.categories) + 1, dtype=object)
+            categories[:-1] = column.categories
+            # code -1 picks the trailing None
+            return categories[values]
+        return values
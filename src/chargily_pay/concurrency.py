@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .settings import (
+    DEFAULT_CONCURRENCY_INITIAL,
+    DEFAULT_CONCURRENCY_MAX,
+    DEFAULT_LATENCY_TOLERANCE,
+)
+
+
+def is_overload(status_code) -> bool:
+    """A status code telling us to slow down, a 429 or any 5xx"""
+    return status_code is not None and (status_code == 429 or status_code >= 500)
+
+
+class _Slot:
+    def __init__(self, started_at):
+        self.started_at = started_at
+        self.status_code = None
+        # latencies are compared with the baseline of this endpoint
+        self.endpoint = None
+
+
+class AdaptiveLimiter:
+    """Concurrency limit adjusted with AIMD (additive increase, multiplicative decrease).
+
+    Every successful request with a latency close to the baseline of its
+    endpoint raises the limit by about `increase` per window of `limit`
+    requests. A 429, a 5xx, a connection error or a latency above
+    `latency_tolerance` times the baseline multiplies it by `decrease`.
+    Requests started before the last decrease don't decrease it again.
+    Baselines are moving averages of every successful request, so they
+    follow lasting latency shifts.
+    """
+
+    def __init__(
+        self,
+        initial: int = DEFAULT_CONCURRENCY_INITIAL,
+        min_limit: int = 1,
+        max_limit: int = DEFAULT_CONCURRENCY_MAX,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_tolerance: float = DEFAULT_LATENCY_TOLERANCE,
+        history_size: int = 100,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self._limit = float(initial)
+        self._in_flight = 0
+        # endpoint -> moving average of the successful latencies
+        self._baselines = {}
+        self._decreased_at = 0.0
+        self._condition = threading.Condition()
+        # (time, limit, reason) of every change of the limit
+        self.history = deque(maxlen=history_size)
+        self.history.append((time.time(), initial, "initial"))
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def metrics(self) -> dict:
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "baseline_latency": dict(self._baselines),
+                "history": list(self.history),
+            }
+
+    def acquire(self) -> _Slot:
+        """Block until the number of requests in flight is below the limit"""
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+        return _Slot(time.monotonic())
+
+    def release(self, slot: _Slot, error: BaseException = None):
+        """Record the outcome of a request and free its slot"""
+        latency = time.monotonic() - slot.started_at
+        with self._condition:
+            self._in_flight -= 1
+            if error is not None:
+                self._decrease(slot, "error")
+            elif is_overload(slot.status_code):
+                self._decrease(slot, str(slot.status_code))
+            else:
+                baseline = self._baselines.get(slot.endpoint)
+                if baseline is not None and latency > baseline * self.latency_tolerance:
+                    self._decrease(slot, "latency")
+                else:
+                    self._increase()
+                self._observe_latency(slot.endpoint, latency)
+            self._condition.notify_all()
+
+    def slot(self):
+        """Context manager around one request, set `status_code` on the slot"""
+        return _SlotContext(self)
+
+    def map(self, fn, items):
+        """Call `fn` on every item, with up to `max_limit` worker threads.
+
+        `fn` should send its requests through a client using this limiter, so
+        the number of requests in flight follows the limit. Results are
+        returned in the order of `items`.
+        """
+        with ThreadPoolExecutor(
+            max_workers=self.max_limit, thread_name_prefix="chargily-adaptive"
+        ) as executor:
+            return list(executor.map(fn, items))
+
+    def _observe_latency(self, endpoint, latency):
+        baseline = self._baselines.get(endpoint)
+        if baseline is None:
+            self._baselines[endpoint] = latency
+        else:
+            self._baselines[endpoint] = baseline + 0.1 * (latency - baseline)
+
+    def _increase(self):
+        previous = self.limit
+        self._limit = min(self.max_limit, self._limit + self.increase / self._limit)
+        if self.limit != previous:
+            self.history.append((time.time(), self.limit, "increase"))
+
+    def _decrease(self, slot, reason):
+        if slot.started_at < self._decreased_at:
+            return
+        self._decreased_at = time.monotonic()
+        self._limit = max(self.min_limit, self._limit * self.decrease)
+        self.history.append((time.time(), self.limit, reason))
+
+
+class _SlotContext:
+    def __init__(self, limiter: AdaptiveLimiter):
+        self.limiter = limiter
+
+    def __enter__(self) -> _Slot:
+        self._slot = self.limiter.acquire()
+        return self._slot
+
+    def __exit__(self, exc_type, exc, tb):
+        self.limiter.release(self._slot, error=exc)
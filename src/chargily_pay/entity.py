@@ -1,6 +1,15 @@
 from dataclasses import dataclass, field
 from typing import Optional
 
+ITEMS_OR_AMOUNT_REQUIRED = "Either items or amount must be provided"
+AMOUNT_TOO_LOW = "amount should be great than 10 dzd"
+CURRENCY_REQUIRED = "Currency must be provided when amount is provided"
+MIN_AMOUNT = 10
+
+
+class ValidationError(Exception):
+    """Raised when an entity is built with invalid values"""
+
 
 @dataclass
 class Address:
@@ -57,13 +66,13 @@ class Checkout:
 
     def __post_init__(self):
         if not self.items and not self.amount:
-            raise Exception("Either items or amount must be provided")
+            raise ValidationError(ITEMS_OR_AMOUNT_REQUIRED)
 
         if self.amount:
-            if self.amount <= 10:
-                raise Exception("amount should be great than 10 dzd")
+            if self.amount <= MIN_AMOUNT:
+                raise ValidationError(AMOUNT_TOO_LOW)
             if not self.currency:
-                raise Exception("Currency must be provided when amount is provided")
+                raise ValidationError(CURRENCY_REQUIRED)
 
 
 @dataclass
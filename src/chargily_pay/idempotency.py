@@ -0,0 +1,117 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from .settings import DEFAULT_IDEMPOTENCY_TTL
+
+
+def payload_key(payload: dict) -> str:
+    """Stable key of a serialized entity"""
+    serialized = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class MemoryIdempotencyStore:
+    """Keep idempotent results in the memory of the current process"""
+
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.time():
+                del self._items[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl: float):
+        with self._lock:
+            self._items[key] = (time.time() + ttl, value)
+            # drop expired entries so the store stays bounded by the TTL
+            now = time.time()
+            for expired in [k for k, (e, _) in self._items.items() if e <= now]:
+                del self._items[expired]
+
+
+class SQLiteIdempotencyStore:
+    """Keep idempotent results in a SQLite database shared between processes"""
+
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS chargily_idempotency ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM chargily_idempotency "
+                "WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl: float):
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO chargily_idempotency VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + ttl),
+            )
+            self._connection.execute(
+                "DELETE FROM chargily_idempotency WHERE expires_at <= ?", (now,)
+            )
+
+    def close(self):
+        self._connection.close()
+
+
+class IdempotencyLayer:
+    """Return the stored result of a call made with the same key within the TTL.
+
+    Concurrent calls with the same key wait for the one already in flight
+    instead of calling the API again.
+    """
+
+    def __init__(self, store=None, ttl: float = DEFAULT_IDEMPOTENCY_TTL):
+        self.store = store if store is not None else MemoryIdempotencyStore()
+        self.ttl = ttl
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, fn):
+        with self._lock:
+            value = self.store.get(key)
+            if value is not None:
+                return value
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self.store.set(key, value, self.ttl)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._in_flight[key]
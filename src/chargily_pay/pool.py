@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .api import ChargilyClient, new_adapter, new_session
+from .ratelimit import RateLimiter
+from .settings import CHARGILIY_URL, DEFAULT_POOL_MAXSIZE, DEFAULT_POOL_TENANTS
+
+
+class ChargilyClientPool:
+    """Clients of many tenants (merchants) sharing one connection pool.
+
+    `credentials` maps a tenant to its `(key, secret)`, either as a dict or a
+    callable. Each tenant gets its own `ChargilyClient`, so its own
+    `Authorization` header, rate limit, caches and session (so cookies), while
+    every session sends its requests through the same connection pool. At
+    most `max_tenants` clients are kept; the least recently used one is
+    evicted first, as is any client unused for `idle_timeout` seconds.
+    Evicted clients are closed.
+    """
+
+    def __init__(
+        self,
+        credentials,
+        url=CHARGILIY_URL,
+        max_tenants: int = DEFAULT_POOL_TENANTS,
+        idle_timeout: float = None,
+        rate_limit: float = None,
+        burst: int = None,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        **client_kwargs,
+    ):
+        self.credentials = credentials
+        self.url = url
+        self.max_tenants = max_tenants
+        self.idle_timeout = idle_timeout
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.client_kwargs = client_kwargs
+
+        # mounted on the session of every tenant
+        self.adapter = new_adapter(pool_maxsize)
+
+        # tenant -> (client, last used at)
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, tenant) -> ChargilyClient:
+        return self.get(tenant)
+
+    def __len__(self):
+        return len(self._clients)
+
+    def __contains__(self, tenant):
+        return tenant in self._clients
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, tenant) -> ChargilyClient:
+        """Return the client of a tenant, creating it when needed"""
+        with self._lock:
+            evicted = self._evict_idle(time.monotonic())
+            entry = self._clients.get(tenant)
+            if entry is not None:
+                self._touch(tenant, entry[0])
+        self._close(evicted)
+        if entry is not None:
+            return entry[0]
+
+        # credentials may come from a slow store, don't block other tenants
+        client = self._create_client(tenant)
+        evicted = []
+        with self._lock:
+            entry = self._clients.get(tenant)
+            if entry is not None:
+                # created concurrently by another caller
+                evicted.append(client)
+                client = entry[0]
+            while (
+                tenant not in self._clients and len(self._clients) >= self.max_tenants
+            ):
+                evicted.append(self._clients.popitem(last=False)[1][0])
+            self._touch(tenant, client)
+        self._close(evicted)
+        return client
+
+    def _touch(self, tenant, client):
+        self._clients[tenant] = (client, time.monotonic())
+        self._clients.move_to_end(tenant)
+
+    def evict(self, tenant):
+        """Drop the client of a tenant, its caches included"""
+        with self._lock:
+            entry = self._clients.pop(tenant, None)
+        if entry is not None:
+            self._close([entry[0]])
+
+    def close(self):
+        with self._lock:
+            clients = [client for client, _ in self._clients.values()]
+            self._clients.clear()
+        for client in clients:
+            client.close()
+        self.adapter.close()
+
+    @staticmethod
+    def _close(clients):
+        # don't hold up the caller on a balance poll in flight
+        for client in clients:
+            client.close(wait=False)
+
+    def _create_client(self, tenant) -> ChargilyClient:
+        if callable(self.credentials):
+            key, secret = self.credentials(tenant)
+        else:
+            key, secret = self.credentials[tenant]
+        rate_limiter = (
+            RateLimiter(self.rate_limit, self.burst)
+            if self.rate_limit is not None
+            else None
+        )
+        return ChargilyClient(
+            key,
+            secret,
+            url=self.url,
+            session=new_session(adapter=self.adapter),
+            rate_limiter=rate_limiter,
+            **self.client_kwargs,
+        )
+
+    def _evict_idle(self, now) -> list:
+        evicted = []
+        if self.idle_timeout is None:
+            return evicted
+        # entries are ordered by last use, the idle ones come first
+        while self._clients:
+            tenant, (client, used_at) = next(iter(self._clients.items()))
+            if now - used_at < self.idle_timeout:
+                break
+            del self._clients[tenant]
+            evicted.append(client)
+        return evicted
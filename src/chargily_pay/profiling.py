@@ -0,0 +1,173 @@
+"""Sampled per-request profiling.
+
+A `Profiler` given to `ChargilyClient` records, for a sampled fraction of the
+calls, how long each step took and appends it as one compact JSON line to a
+rotating trace file. Print per-endpoint percentiles with:
+
+    chargily-pay profile-report chargily-trace.log
+"""
+
+import glob
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from logging.handlers import RotatingFileHandler
+
+from .settings import (
+    DEFAULT_PROFILE_BACKUP_COUNT,
+    DEFAULT_PROFILE_MAX_BYTES,
+    DEFAULT_PROFILE_SAMPLE_RATE,
+)
+
+# in the order they happen
+SPANS = ("serialize", "queue", "ttfb", "receive", "decode")
+
+_local = threading.local()
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+def span(name: str):
+    """Time the block into the trace of the current call, if it is sampled"""
+    trace = current_trace()
+    return trace.span(name) if trace is not None else nullcontext()
+
+
+class Trace:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.endpoint = None
+        self.method = None
+        self.status = None
+        # a new connection was opened for the request
+        self.connected = False
+        self.spans = {}
+
+    def add(self, name: str, seconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    @contextmanager
+    def span(self, name: str):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name, time.monotonic() - started)
+
+    def record(self) -> dict:
+        record = {
+            "t": round(time.time(), 3),
+            "e": self.endpoint,
+            "m": self.method,
+            "s": self.status,
+            "total": round((time.monotonic() - self.started_at) * 1000, 3),
+        }
+        if self.connected:
+            record["c"] = 1
+        # milliseconds
+        record.update((k, round(v * 1000, 3)) for k, v in self.spans.items())
+        return record
+
+
+class Profiler:
+    """Trace a `sample_rate` fraction of the calls into a rotating file.
+
+    Spans, in milliseconds: `serialize` (entity to dict), `queue` (waiting on
+    rate and concurrency limiters), `ttfb` (connect, send and wait for the
+    response headers), `receive` (read the body) and `decode` (JSON). Requests
+    that opened a new connection are flagged with `"c": 1`.
+    """
+
+    def __init__(
+        self,
+        path,
+        sample_rate: float = DEFAULT_PROFILE_SAMPLE_RATE,
+        max_bytes: int = DEFAULT_PROFILE_MAX_BYTES,
+        backup_count: int = DEFAULT_PROFILE_BACKUP_COUNT,
+    ):
+        self.path = path
+        self.sample_rate = sample_rate
+        handler = RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        # not attached to the logging hierarchy, traces only go to the file
+        self._logger = logging.Logger(f"chargily_pay.profiling.{id(self)}")
+        self._logger.addHandler(handler)
+        self._handler = handler
+
+    @contextmanager
+    def trace(self):
+        """Trace the call made inside the block, if it is sampled"""
+        if current_trace() is not None or random.random() >= self.sample_rate:
+            yield None
+            return
+        trace = _local.trace = Trace()
+        try:
+            yield trace
+        finally:
+            _local.trace = None
+            if trace.endpoint is not None:
+                self._logger.info(json.dumps(trace.record(), separators=(",", ":")))
+
+    def close(self):
+        self._handler.close()
+
+
+# ==================================
+# Analyzer
+# ==================================
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def load(paths) -> dict:
+    """Return `{(method, endpoint): {span: [milliseconds]}}` from trace files"""
+    stats = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                spans = stats.setdefault((record["m"], record["e"]), {})
+                for name in SPANS + ("total",):
+                    if name in record:
+                        spans.setdefault(name, []).append(record[name])
+    return stats
+
+
+def report(stats: dict, percentiles=(50, 90, 99)) -> str:
+    """Format one table per endpoint, a row per span and a column per percentile"""
+    lines = []
+    for (method, endpoint), spans in sorted(stats.items(), key=lambda x: x[0][1]):
+        count = len(spans.get("total", ()))
+        lines.append(f"{method} {endpoint} ({count} calls)")
+        lines.append(
+            f"  {'span':<10}" + "".join(f"{f'p{p:g}':>10}" for p in percentiles)
+        )
+        for name in SPANS + ("total",):
+            if name in spans:
+                cells = "".join(
+                    f"{percentile(spans[name], p):>10.1f}" for p in percentiles
+                )
+                lines.append(f"  {name:<10}{cells}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def trace_files(path) -> list:
+    """A trace file and its rotated backups, oldest first"""
+    backups = [
+        p for p in glob.glob(glob.escape(path) + ".*") if p.rsplit(".", 1)[1].isdigit()
+    ]
+    return sorted(backups, key=lambda p: -int(p.rsplit(".", 1)[1])) + [path]
@@ -0,0 +1,40 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` requests per second with bursts of `burst`"""
+
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent, return the seconds waited"""
+        waited = 0.0
+        while True:
+            delay = self._take()
+            if delay == 0:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available now, without waiting"""
+        return self._take() == 0
+
+    def _take(self) -> float:
+        """Take a token and return 0, or return the seconds until one is due"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
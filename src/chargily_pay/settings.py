@@ -1,2 +1,41 @@
 CHARGILIY_URL = "https://pay.chargily.net/api/v2/"
 CHARGILIY_TEST_URL = "https://pay.chargily.net/test/api/v2/"
+
+# (connect, read) timeout in seconds
+DEFAULT_TIMEOUT = (5, 30)
+DEFAULT_HEDGE_MIN_SAMPLES = 20
+# GET requests hedged at once, the others are sent without a duplicate
+DEFAULT_HEDGE_WORKERS = 8
+
+DEFAULT_WRITE_BEHIND_CONCURRENCY = 4
+# seconds updates are held to be merged before being sent
+DEFAULT_WRITE_BEHIND_INTERVAL = 1.0
+# seconds before the first retry of a failed update, doubled on every retry
+DEFAULT_WRITE_BEHIND_BACKOFF = 0.5
+DEFAULT_WRITE_BEHIND_MAX_BACKOFF = 30.0
+
+# seconds a create_checkout result is reused for the same idempotency key
+DEFAULT_IDEMPOTENCY_TTL = 15 * 60
+
+DEFAULT_POOL_TENANTS = 256
+# connections kept open to the API by a client pool
+DEFAULT_POOL_MAXSIZE = 32
+
+DEFAULT_CONCURRENCY_INITIAL = 4
+DEFAULT_CONCURRENCY_MAX = 64
+# latency above this multiple of the baseline counts as a spike
+DEFAULT_LATENCY_TOLERANCE = 2.0
+
+# seconds between two balance polls
+DEFAULT_BALANCE_INTERVAL = 5.0
+
+# bytes read at once from a streamed (already decompressed) list page
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# connections opened by ChargilyClient.warmup()
+DEFAULT_WARMUP_CONNECTIONS = 4
+
+# fraction of the calls traced by a Profiler
+DEFAULT_PROFILE_SAMPLE_RATE = 0.01
+DEFAULT_PROFILE_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_PROFILE_BACKUP_COUNT = 3
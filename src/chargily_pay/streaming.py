@@ -0,0 +1,124 @@
+import codecs
+import json
+
+WHITESPACE = " \t\r\n"
+
+
+class _Reader:
+    """Text decoded from byte chunks, read forward and dropped once consumed"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+
+    def more(self) -> bool:
+        """Read the next chunk, False at the end of the body"""
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self.buffer = self.buffer[self.pos :] + text
+                self.pos = 0
+                return True
+        return False
+
+    def peek(self) -> str:
+        """Return the next non whitespace character without consuming it"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.more():
+                raise ValueError("unexpected end of JSON body")
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} at {self.buffer[self.pos:][:20]!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the JSON value starting at the next character"""
+        self.peek()
+        start = self.pos
+        end = start
+        depth = 0
+        in_string = False
+        escaped = False
+        first = self.buffer[start]
+        while True:
+            buffer = self.buffer
+            while end < len(buffer):
+                char = buffer[end]
+                end += 1
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == "\\":
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                        if depth == 0:
+                            return self._decode(start, end)
+                elif char == '"':
+                    in_string = True
+                elif char in "{[":
+                    depth += 1
+                elif char in "}]":
+                    if depth == 0:
+                        # end of a scalar, the bracket belongs to the parent
+                        return self._decode(start, end - 1)
+                    depth -= 1
+                    if depth == 0:
+                        return self._decode(start, end)
+                elif char == "," and depth == 0 and first not in "{[":
+                    return self._decode(start, end - 1)
+            # value continues in the next chunk, offsets are kept relative
+            start -= self.pos
+            end -= self.pos
+            if not self.more():
+                raise ValueError("unexpected end of JSON body")
+            start += self.pos
+            end += self.pos
+
+    def _decode(self, start, end):
+        self.pos = end
+        return json.loads(self.buffer[start:end])
+
+
+class PageStream:
+    """Decode the items of a list page one at a time as its body arrives.
+
+    Iterating yields the decoded items of the `data` array. The other keys of
+    the page (`last_page`, `next_page_url`, ...) are stored in `meta`; the
+    ones after `data` are only known once iteration is over.
+    """
+
+    def __init__(self, chunks, key: str = "data"):
+        self.key = key
+        self.meta = {}
+        self._reader = _Reader(chunks)
+
+    def __iter__(self):
+        reader = self._reader
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            name = reader.value()
+            reader.expect(":")
+            if name == self.key and reader.peek() == "[":
+                reader.expect("[")
+                if reader.peek() != "]":
+                    while True:
+                        yield reader.value()
+                        if reader.peek() == "]":
+                            break
+                        reader.expect(",")
+                reader.expect("]")
+            else:
+                self.meta[name] = reader.value()
+            if reader.peek() == "}":
+                return
+            reader.expect(",")
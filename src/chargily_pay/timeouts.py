@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import deque
+
+import requests
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Raised when a deadline expires before a request could be sent"""
+
+
+class Deadline:
+    """An absolute point in time shared by several requests.
+
+    Multi-request operations (pagination for example) create one deadline and
+    every request made under it gets at most the time that is left.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, timeout=None):
+        """Clamp a requests `timeout` to the remaining time"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"deadline of {self.seconds}s exceeded")
+        if timeout is None:
+            return remaining
+        if isinstance(timeout, tuple):
+            return tuple(
+                min(t, remaining) if t is not None else remaining for t in timeout
+            )
+        return min(timeout, remaining)
+
+
+class LatencyTracker:
+    """Keeps the most recent latencies per endpoint to compute percentiles"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint: str, latency: float):
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append(latency)
+
+    def count(self, endpoint: str) -> int:
+        with self._lock:
+            return len(self._samples.get(endpoint, ()))
+
+    def percentile(self, endpoint: str, percentile: float):
+        """Return the latency percentile of an endpoint, None without samples"""
+        with self._lock:
+            samples = sorted(self._samples.get(endpoint, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+
+from .settings import DEFAULT_BALANCE_INTERVAL
+
+
+class BalanceWatcher:
+    """Poll the balance in one background thread and serve the last value.
+
+    Polls send `If-None-Match` with the last `ETag`; when the API doesn't
+    return one, the wallets are compared with the previous poll instead.
+    Subscribers are called with `(currency, wallet, previous_wallet)` only
+    when a wallet changes. Coroutine subscribers run on the event loop they
+    subscribed from. After `stop()`, the next `get()` or `subscribe()`
+    starts polling again.
+    """
+
+    def __init__(self, client, interval: float = DEFAULT_BALANCE_INTERVAL):
+        self.client = client
+        self.interval = interval
+        self.last_error = None
+        self._balance = None
+        self._etag = None
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get(self, timeout: float = None) -> dict:
+        """Return the last balance, waiting for the first poll if needed"""
+        self._start()
+        if not self._ready.wait(timeout):
+            raise TimeoutError("balance was not received in time")
+        if self._balance is None:
+            raise self.last_error
+        return self._balance
+
+    def subscribe(self, callback):
+        """Call `callback` on every wallet change, return an unsubscribe function"""
+        loop = None
+        if asyncio.iscoroutinefunction(callback):
+            loop = asyncio.get_running_loop()
+        subscriber = (callback, loop)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        self._start()
+
+        def unsubscribe():
+            with self._lock:
+                if subscriber in self._subscribers:
+                    self._subscribers.remove(subscriber)
+
+        return unsubscribe
+
+    def stop(self, wait: bool = True):
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+            # the balance is stale until polling starts again
+            self._ready.clear()
+        if thread is not None and wait:
+            thread.join()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._stop = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run,
+                    args=(self._stop,),
+                    name="chargily-balance-watcher",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def _run(self, stop):
+        while not stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                # keep serving the last balance
+                self.last_error = e
+                self._ready.set()
+            stop.wait(self.interval)
+
+    def poll(self):
+        """Fetch the balance now and notify subscribers of changes"""
+        headers = {"If-None-Match": self._etag} if self._etag else {}
+        response = self.client._request("GET", "balance", headers=headers)
+        if response.status_code == 304:
+            self._ready.set()
+            return
+        response.raise_for_status()
+
+        balance = response.json()
+        self._etag = response.headers.get("ETag")
+        # subscribers added after the swap compare with the new balance
+        with self._lock:
+            previous, self._balance = self._balance, balance
+            subscribers = list(self._subscribers)
+        self.last_error = None
+        self._ready.set()
+        self._notify(previous, balance, subscribers)
+
+    def _notify(self, previous, balance, subscribers):
+        old_wallets = {w["currency"]: w for w in (previous or {}).get("wallets", [])}
+        for wallet in balance.get("wallets", []):
+            old = old_wallets.get(wallet["currency"])
+            if old == wallet:
+                continue
+            for callback, loop in subscribers:
+                args = (wallet["currency"], wallet, old)
+                try:
+                    if loop is None:
+                        callback(*args)
+                    else:
+                        asyncio.run_coroutine_threadsafe(callback(*args), loop)
+                except Exception as e:
+                    # one failing subscriber doesn't starve the others
+                    self.last_error = e
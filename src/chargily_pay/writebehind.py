@@ -0,0 +1,336 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+
+from .api import ChargilyClient, asdict_true_value, json_or_exception
+from .concurrency import is_overload
+from .entity import PaymentLink, Product
+from .settings import (
+    DEFAULT_WRITE_BEHIND_BACKOFF,
+    DEFAULT_WRITE_BEHIND_CONCURRENCY,
+    DEFAULT_WRITE_BEHIND_INTERVAL,
+    DEFAULT_WRITE_BEHIND_MAX_BACKOFF,
+)
+
+# resource name -> update path
+RESOURCE_PATHS = {
+    "product": "products/{id}",
+    "price": "prices/{id}",
+    "payment_link": "payment-links/{id}",
+}
+
+
+def _transient(error) -> bool:
+    """A failure worth retrying: no response, a 429 or a 5xx"""
+    if not isinstance(error, requests.exceptions.RequestException):
+        return False
+    response = error.response
+    return response is None or is_overload(response.status_code)
+
+
+class _PendingWrite:
+    def __init__(self, payload: dict, seqs: list, futures: list):
+        self.payload = payload
+        self.seqs = seqs
+        self.futures = futures
+        # failed attempts so far and when the next one may be sent
+        self.attempts = 0
+        self.retry_at = 0.0
+
+    def absorb(self, newer: "_PendingWrite"):
+        """Merge updates queued after this write, their fields win"""
+        self.payload.update(newer.payload)
+        self.seqs.extend(newer.seqs)
+        self.futures.extend(newer.futures)
+
+
+class WriteBehindQueue:
+    """Coalesce updates of the same entity and send them in the background.
+
+    Updates queued for an entity before it is flushed are merged into one
+    request, later fields overriding earlier ones. Each update returns a
+    `Future` resolved with the API response once the merged request is acked.
+    With `journal_path` set, pending updates are appended to a journal and
+    replayed when the queue is created again after a crash.
+
+    Updates failing with a connection error, a 429 or a 5xx are retried with
+    exponential backoff from `retry_backoff` seconds, merged under the
+    updates queued meanwhile; their futures wait for the retry. Once the
+    queue is closing they are not retried anymore: their futures fail and
+    they stay in the journal for the next queue.
+    """
+
+    def __init__(
+        self,
+        client: ChargilyClient,
+        max_concurrency: int = DEFAULT_WRITE_BEHIND_CONCURRENCY,
+        flush_interval: float = DEFAULT_WRITE_BEHIND_INTERVAL,
+        journal_path=None,
+        retry_backoff: float = DEFAULT_WRITE_BEHIND_BACKOFF,
+    ):
+        self.client = client
+        self.flush_interval = flush_interval
+        self.journal_path = journal_path
+        self.retry_backoff = retry_backoff
+        # key -> write waiting to be sent, and key -> write being sent
+        self._pending = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._closed = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="chargily-write-behind"
+        )
+        self._journal = None
+        # seq -> put record of the journaled updates not acked yet
+        self._records = {}
+        if journal_path is not None:
+            self._replay_journal()
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="chargily-write-behind-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ==================================
+    # Updates
+    # ==================================
+
+    def update_product(self, id, product: Product) -> Future:
+        """Queue a product update"""
+        return self._enqueue("product", id, asdict_true_value(product))
+
+    def update_price(self, id, metadata: list[dict]) -> Future:
+        """Queue a price metadata update"""
+        return self._enqueue("price", id, {"metadata": metadata})
+
+    def update_payment_link(self, id, payment_link: PaymentLink) -> Future:
+        """Queue a payment link update"""
+        return self._enqueue("payment_link", id, asdict_true_value(payment_link))
+
+    def _enqueue(self, resource, id, payload, seq=None, future=None) -> Future:
+        future = future or Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("write-behind queue is closed")
+            if seq is None:
+                self._seq += 1
+                seq = self._seq
+                self._journal_put(
+                    {
+                        "op": "put",
+                        "seq": seq,
+                        "resource": resource,
+                        "id": id,
+                        "payload": payload,
+                    }
+                )
+            key = (resource, id)
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = _PendingWrite(dict(payload), [seq], [future])
+            else:
+                pending.payload.update(payload)
+                pending.seqs.append(seq)
+                pending.futures.append(future)
+        return future
+
+    # ==================================
+    # Flushing
+    # ==================================
+
+    def flush(self) -> Future:
+        """Send every pending update now.
+
+        Returns a future resolved once all updates queued before the call,
+        in flight ones included, are acked or failed for good.
+        """
+        with self._lock:
+            writes = [*self._pending.values(), *self._in_flight.values()]
+            futures = [f for write in writes for f in write.futures]
+        self._wakeup.set()
+
+        done = Future()
+        remaining = [len(futures)]
+        if not futures:
+            done.set_result(None)
+
+        def on_done(_):
+            with self._lock:
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+            if finished:
+                done.set_result(None)
+
+        for future in futures:
+            future.add_done_callback(on_done)
+        return done
+
+    def close(self, timeout=None):
+        """Flush pending updates and stop the background thread"""
+        with self._lock:
+            self._closed = True
+        self.flush().result(timeout)
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._executor.shutdown(wait=True)
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self._next_wakeup())
+            self._wakeup.clear()
+            self._dispatch()
+            with self._lock:
+                if self._closed and not self._pending:
+                    return
+
+    def _next_wakeup(self) -> float:
+        """Seconds until the next flush or the next retry, the earliest"""
+        now = time.monotonic()
+        with self._lock:
+            retries = [p.retry_at - now for p in self._pending.values() if p.attempts]
+        return max(0.0, min([self.flush_interval, *retries]))
+
+    def _dispatch(self):
+        now = time.monotonic()
+        with self._lock:
+            # never send two requests for the same entity at once, and wait
+            # for the backoff of retries unless the queue is closing
+            ready = [
+                key
+                for key, pending in self._pending.items()
+                if key not in self._in_flight
+                and (pending.retry_at <= now or self._closed)
+            ]
+            batch = [(key, self._pending.pop(key)) for key in ready]
+            self._in_flight.update(batch)
+        for key, pending in batch:
+            self._executor.submit(self._send, key, pending)
+
+    def _send(self, key, pending: _PendingWrite):
+        resource, id = key
+        path = RESOURCE_PATHS[resource].format(id=id)
+        try:
+            result = json_or_exception(
+                self.client._request("POST", path, json=pending.payload)
+            )
+            error = None
+        except Exception as e:
+            result, error = None, e
+
+        with self._lock:
+            del self._in_flight[key]
+            retry = _transient(error) and not self._closed
+            if retry:
+                newer = self._pending.get(key)
+                if newer is not None:
+                    pending.absorb(newer)
+                pending.attempts += 1
+                backoff = self.retry_backoff * 2 ** (pending.attempts - 1)
+                pending.retry_at = time.monotonic() + min(
+                    backoff, DEFAULT_WRITE_BEHIND_MAX_BACKOFF
+                )
+                self._pending[key] = pending
+            elif not _transient(error):
+                self._ack(key, max(pending.seqs))
+            self._compact_journal()
+        if key in self._pending:
+            self._wakeup.set()
+        if retry:
+            return
+
+        for future in pending.futures:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    # ==================================
+    # Journal
+    # ==================================
+
+    def _ack(self, key, seq):
+        """Ack the records of an entity up to `seq`, the write replaced them"""
+        resource, id = key
+        acked = [
+            s
+            for s, record in self._records.items()
+            if s <= seq and record["resource"] == resource and record["id"] == id
+        ]
+        for s in acked:
+            del self._records[s]
+        self._journal_write(*({"op": "ack", "seq": s} for s in acked))
+
+    def _journal_put(self, record: dict):
+        if self._journal is None:
+            return
+        self._records[record["seq"]] = record
+        self._journal_write(record)
+
+    def _journal_write(self, *records):
+        if self._journal is None or not records:
+            return
+        self._journal.write("".join(json.dumps(r) + "\n" for r in records))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _compact_journal(self):
+        """Keep only the unacked records once nothing is pending or in flight"""
+        if self._journal is None or self._pending or self._in_flight:
+            return
+        self._rewrite_journal()
+
+    def _rewrite_journal(self):
+        """Replace the journal with the unacked records.
+
+        The records go to a temporary file first, renamed over the journal,
+        so a crash at any point leaves either the old or the new journal.
+        """
+        temporary = f"{self.journal_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(
+                "".join(
+                    json.dumps(self._records[s]) + "\n" for s in sorted(self._records)
+                )
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.journal_path)
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _replay_journal(self):
+        puts = {}
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, encoding="utf-8") as journal:
+                for line in journal:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # torn write from a crash
+                        break
+                    if record["op"] == "put":
+                        puts[record["seq"]] = record
+                    else:
+                        puts.pop(record["seq"], None)
+
+        self._records = puts
+        self._rewrite_journal()
+        for seq in sorted(puts):
+            record = puts[seq]
+            self._seq = seq
+            self._enqueue(record["resource"], record["id"], record["payload"], seq=seq)
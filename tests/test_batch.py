@@ -0,0 +1,144 @@
+import unittest
+
+from src.chargily_pay.api import asdict_true_value
+from src.chargily_pay.batch import (
+    AMOUNT_NOT_INTEGER,
+    SUCCESS_URL_REQUIRED,
+    build_checkouts,
+    build_payment_links,
+)
+from src.chargily_pay.entity import (
+    AMOUNT_TOO_LOW,
+    CURRENCY_REQUIRED,
+    ITEMS_OR_AMOUNT_REQUIRED,
+    Checkout,
+    CheckoutItem,
+    PaymentItem,
+    ValidationError,
+)
+
+
+class TestBuildCheckouts(unittest.TestCase):
+    def test_errors_are_reported_per_row(self):
+        result = build_checkouts(
+            success_url=[
+                "https://example.com/success",
+                None,
+                "https://example.com/success",
+            ],
+            amount=[1000, 5, None],
+            currency=["dzd", None, "dzd"],
+        )
+        self.assertFalse(result.ok)
+        self.assertEqual(
+            result.report(),
+            [
+                (1, SUCCESS_URL_REQUIRED),
+                (1, AMOUNT_TOO_LOW),
+                (1, CURRENCY_REQUIRED),
+                (2, ITEMS_OR_AMOUNT_REQUIRED),
+            ],
+        )
+        self.assertEqual(result.rows, [0])
+
+    def test_payloads_match_checkout_serialization(self):
+        items = [CheckoutItem(price="01hj", quantity=2)]
+        result = build_checkouts(
+            success_url="https://example.com/success",
+            items=[items, items],
+            payment_method=["cib", "edahabia"],
+        )
+        self.assertTrue(result.ok)
+        expected = asdict_true_value(
+            Checkout(
+                success_url="https://example.com/success",
+                items=items,
+                payment_method="edahabia",
+            )
+        )
+        self.assertEqual(result.payloads[1], expected)
+
+    def test_missing_amounts_are_dropped_and_others_sent_as_int(self):
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest("numpy is not installed")
+        items = [CheckoutItem(price="01hj", quantity=1)]
+        result = build_checkouts(
+            success_url="https://example.com/success",
+            items=[items, None],
+            amount=np.array([np.nan, 1000.0]),
+            currency="dzd",
+        )
+        self.assertTrue(result.ok)
+        self.assertNotIn("amount", result.payloads[0])
+        self.assertEqual(result.payloads[1]["amount"], 1000)
+        self.assertIsInstance(result.payloads[1]["amount"], int)
+
+        result = build_checkouts(
+            success_url="https://example.com/success", amount=[float("nan")]
+        )
+        self.assertEqual(result.report(), [(0, ITEMS_OR_AMOUNT_REQUIRED)])
+
+    def test_amounts_that_are_not_integers_are_reported(self):
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest("numpy is not installed")
+        for amounts in (
+            ["1000", 1000, 10.5, None],
+            np.array(["1000", 1000, 10.5, None], dtype=object),
+        ):
+            result = build_checkouts(
+                success_url="https://example.com/success",
+                amount=amounts,
+                currency="dzd",
+            )
+            self.assertEqual(
+                result.report(),
+                [
+                    (0, AMOUNT_NOT_INTEGER),
+                    (2, AMOUNT_NOT_INTEGER),
+                    (3, ITEMS_OR_AMOUNT_REQUIRED),
+                ],
+            )
+            self.assertEqual(result.payloads[0]["amount"], 1000)
+
+        result = build_checkouts(
+            success_url="https://example.com/success",
+            amount=np.array([10.5, 1000.0]),
+            currency="dzd",
+        )
+        self.assertEqual(result.report(), [(0, AMOUNT_NOT_INTEGER)])
+
+    def test_shared_metadata_is_broadcast(self):
+        result = build_checkouts(
+            success_url="https://example.com/success",
+            amount=[1000, 2000],
+            currency="dzd",
+            metadata=[{"campaign": "spring"}],
+        )
+        self.assertTrue(result.ok)
+        for payload in result.payloads:
+            self.assertEqual(payload["metadata"], [{"campaign": "spring"}])
+
+    def test_columns_must_have_the_same_length(self):
+        with self.assertRaises(ValueError):
+            build_checkouts(success_url=["a", "b"], amount=[1000])
+
+    def test_checkout_raises_validation_error(self):
+        with self.assertRaises(ValidationError):
+            Checkout(success_url="https://example.com/success", amount=5)
+
+
+class TestBuildPaymentLinks(unittest.TestCase):
+    def test_build_payment_links(self):
+        result = build_payment_links(
+            name=["Link", ""],
+            items=[[PaymentItem(price="01hj", quantity=1)], []],
+        )
+        self.assertEqual(sorted(result.errors), [1])
+        self.assertEqual(
+            result.payloads,
+            [{"name": "Link", "items": [{"price": "01hj", "quantity": 1}]}],
+        )
@@ -0,0 +1,129 @@
+import csv
+import datetime
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from src.chargily_pay.cli import main
+
+CUSTOMERS = [{"id": f"customer-{i}", "name": f"Customer {i}"} for i in range(3)]
+
+
+def fake_request(session, method, url, **kwargs):
+    """Customers API: creates customers (refusing the name "bad") and lists
+    CUSTOMERS two per page"""
+    response = requests.Response()
+    response.elapsed = datetime.timedelta(0)
+    if method == "POST":
+        name = kwargs["json"]["name"]
+        if name == "bad":
+            response.status_code = 422
+            body = {"message": "invalid"}
+        else:
+            response.status_code = 200
+            body = {"id": f"created-{name}"}
+    else:
+        page = int(parse_qs(urlparse(url).query)["page"][0])
+        response.status_code = 200
+        body = {"data": CUSTOMERS[(page - 1) * 2 : page * 2], "last_page": 2}
+    response._content = json.dumps(body).encode()
+    response._content_consumed = True
+    return response
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        patcher = mock.patch.object(requests.Session, "request", fake_request)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def run_cli(self, *args):
+        return main(["--secret", "secret", "--output", self.path("out"), *args])
+
+    def read_output(self):
+        with open(self.path("out"), encoding="utf-8") as f:
+            return f.read()
+
+    def test_import_resumes_from_checkpoint(self):
+        with open(self.path("customers.jsonl"), "w", encoding="utf-8") as f:
+            for name in ("a", "bad", "c"):
+                f.write(json.dumps({"name": name, "email": "a@b.dz"}) + "\n")
+        args = ["import", "customers", self.path("customers.jsonl")]
+        args += ["--checkpoint", self.path("checkpoint"), "--concurrency", "2"]
+
+        self.assertEqual(self.run_cli(*args), 1)
+        with open(self.path("checkpoint"), encoding="utf-8") as f:
+            self.assertEqual(sorted(f.read().split()), ["0", "2"])
+
+        # only the failed row is sent again
+        with open(self.path("customers.jsonl"), "w", encoding="utf-8") as f:
+            for name in ("a", "b", "c"):
+                f.write(json.dumps({"name": name, "email": "a@b.dz"}) + "\n")
+        self.assertEqual(self.run_cli(*args), 0)
+        records = [json.loads(line) for line in self.read_output().splitlines()]
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[-1], {"row": 1, "id": "created-b"})
+
+    def test_export_jsonl(self):
+        self.assertEqual(self.run_cli("export", "customers", "--per-page", "2"), 0)
+        items = [json.loads(line) for line in self.read_output().splitlines()]
+        self.assertEqual(items, CUSTOMERS)
+
+    def test_resumed_csv_export_has_one_header(self):
+        self.run_cli("export", "customers", "--format", "csv")
+        with open(self.path("out"), encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        with open(self.path("out"), "w", encoding="utf-8") as f:
+            # interrupted after the first page
+            f.write("\n".join(lines[:3]) + "\n")
+
+        self.run_cli("export", "customers", "--format", "csv", "--start-page", "2")
+        with open(self.path("out"), encoding="utf-8", newline="") as f:
+            self.assertEqual(list(csv.DictReader(f)), CUSTOMERS)
+
+    def test_export_resumes_after_the_last_checkpointed_page(self):
+        args = ["export", "customers", "--format", "csv", "--per-page", "2"]
+        args += ["--checkpoint", self.path("checkpoint")]
+        self.assertEqual(self.run_cli(*args), 0)
+        with open(self.path("checkpoint"), encoding="utf-8") as f:
+            pages = [int(line.split()[0]) for line in f]
+        self.assertEqual(pages, [0, 1, 2])
+
+        # interrupted in the middle of the second page, the existing header
+        # has its own column order
+        first_page = "name,id\r\nCustomer 0,customer-0\r\nCustomer 1,customer-1\r\n"
+        with open(self.path("out"), "w", encoding="utf-8", newline="") as f:
+            f.write(first_page + "Customer 2,cust")
+        with open(self.path("checkpoint"), "w", encoding="utf-8") as f:
+            f.write(f"0 0\n1 {len(first_page)}\n")
+
+        self.assertEqual(self.run_cli(*args), 0)
+        with open(self.path("out"), encoding="utf-8", newline="") as f:
+            self.assertEqual(f.read(), first_page + "Customer 2,customer-2\r\n")
+
+    def test_replay_webhooks(self):
+        payload = '{"type":"checkout.paid"}'
+        signature = hmac.new(b"secret", payload.encode(), hashlib.sha256).hexdigest()
+        with open(self.path("webhooks.jsonl"), "w", encoding="utf-8") as f:
+            f.write(json.dumps({"signature": signature, "payload": payload}) + "\n")
+            f.write(json.dumps({"signature": "forged", "payload": payload}) + "\n")
+
+        self.assertEqual(
+            self.run_cli("replay-webhooks", self.path("webhooks.jsonl")), 1
+        )
+        self.assertEqual(
+            json.loads(self.read_output()), {"row": 1, "error": "invalid signature"}
+        )
@@ -0,0 +1,76 @@
+import unittest
+
+from src.chargily_pay.columnar import CHECKOUT_COLUMNS, ColumnarResult
+
+PAGE = {
+    "data": [
+        {
+            "id": "a",
+            "amount": 1000,
+            "currency": "dzd",
+            "status": "paid",
+            "created_at": 1700000000,
+        },
+        {"id": "b", "amount": 2500, "currency": "dzd", "status": "pending", "fees": 10},
+    ]
+}
+
+
+class TestColumnarResult(unittest.TestCase):
+    def test_typed_columns(self):
+        result = ColumnarResult(CHECKOUT_COLUMNS)
+        result.add_page(PAGE)
+        self.assertEqual(len(result), 2)
+        amount = result._columns["amount"]
+        self.assertEqual(amount.values.typecode, "q")
+        self.assertEqual(list(amount.values), [1000, 2500])
+        status = result._columns["status"]
+        self.assertEqual(status.categories, ["paid", "pending"])
+        self.assertEqual(list(status.values), [0, 1])
+        self.assertEqual(bytes(result._columns["created_at"].valid), b"\x01\x00")
+
+    def test_inferred_schema(self):
+        result = ColumnarResult.from_items(PAGE["data"])
+        self.assertEqual(
+            result.schema,
+            {
+                "id": "str",
+                "amount": "int",
+                "currency": "category",
+                "status": "category",
+                "created_at": "timestamp",
+            },
+        )
+
+    def test_to_pandas(self):
+        try:
+            import pandas  # noqa: F401
+        except ImportError:
+            self.skipTest("pandas is not installed")
+        df = ColumnarResult.from_items(PAGE["data"], CHECKOUT_COLUMNS).to_pandas()
+        self.assertEqual(str(df["amount"].dtype), "int64")
+        self.assertEqual(str(df["status"].dtype), "category")
+        self.assertEqual(
+            df.groupby("currency", observed=True)["amount"].sum()["dzd"], 3500
+        )
+
+    def test_to_pandas_float_nulls(self):
+        try:
+            import pandas  # noqa: F401
+        except ImportError:
+            self.skipTest("pandas is not installed")
+        items = [{"rate": 1.5}, {"rate": None}]
+        df = ColumnarResult.from_items(items, {"rate": "float"}).to_pandas()
+        self.assertEqual(df["rate"][0], 1.5)
+        self.assertTrue(df["rate"].isna()[1])
+
+    def test_bad_value_leaves_columns_aligned(self):
+        result = ColumnarResult(CHECKOUT_COLUMNS)
+        result.add_page(PAGE)
+        with self.assertRaisesRegex(ValueError, "'fees'"):
+            result.append({"id": "c", "amount": 100, "fees": 1.5})
+        self.assertEqual({len(c.valid) for c in result._columns.values()}, {2})
+
+        result.append({"id": "c", "amount": 100.0, "fees": 2})
+        self.assertEqual(list(result._columns["amount"].values), [1000, 2500, 100])
+        self.assertEqual(len(result), 3)
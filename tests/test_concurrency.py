@@ -0,0 +1,74 @@
+import time
+import unittest
+
+from src.chargily_pay.concurrency import AdaptiveLimiter
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def test_limit_increases_while_requests_succeed(self):
+        limiter = AdaptiveLimiter(initial=2, max_limit=4, latency_tolerance=1000)
+        for _ in range(50):
+            with limiter.slot() as slot:
+                slot.status_code = 200
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_limit_decreases_on_overload(self):
+        limiter = AdaptiveLimiter(initial=8)
+        with limiter.slot() as slot:
+            slot.status_code = 429
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.metrics()["history"][-1][1:], (4, "429"))
+
+        with self.assertRaises(ConnectionError):
+            with limiter.slot():
+                raise ConnectionError()
+        self.assertEqual(limiter.limit, 2)
+
+    def test_every_5xx_decreases_the_limit(self):
+        for status_code in (501, 507, 522):
+            limiter = AdaptiveLimiter(initial=8)
+            with limiter.slot() as slot:
+                slot.status_code = status_code
+            self.assertEqual(limiter.limit, 4)
+
+    def test_requests_started_before_a_decrease_are_ignored(self):
+        limiter = AdaptiveLimiter(initial=8)
+        first, second = limiter.acquire(), limiter.acquire()
+        first.status_code = second.status_code = 503
+        limiter.release(first)
+        limiter.release(second)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_map(self):
+        limiter = AdaptiveLimiter(max_limit=4)
+        self.assertEqual(limiter.map(lambda x: x * 2, range(10)), list(range(0, 20, 2)))
+
+    def test_baseline_follows_a_lasting_latency_shift(self):
+        limiter = AdaptiveLimiter(initial=8, max_limit=8)
+        slot = limiter.acquire()
+        slot.started_at -= 0.01
+        limiter.release(slot)
+        # every request is now 10 times slower than the first one
+        for _ in range(100):
+            slot = limiter.acquire()
+            slot.started_at -= 0.1
+            limiter.release(slot)
+        self.assertGreater(limiter.metrics()["baseline_latency"][None], 0.05)
+        self.assertEqual(limiter.limit, 8)
+
+    def test_baselines_are_per_endpoint(self):
+        limiter = AdaptiveLimiter(initial=8)
+        for endpoint, latency in (("balance", 0.01), ("checkouts", 0.5)):
+            slot = limiter.acquire()
+            slot.endpoint = endpoint
+            slot.started_at -= latency
+            limiter.release(slot)
+        slot = limiter.acquire()
+        slot.endpoint = "checkouts"
+        slot.started_at -= 0.5
+        limiter.release(slot)
+        self.assertEqual(limiter.limit, 8)
+        self.assertEqual(
+            set(limiter.metrics()["baseline_latency"]), {"balance", "checkouts"}
+        )
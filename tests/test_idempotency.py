@@ -0,0 +1,109 @@
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import requests
+
+from src.chargily_pay.api import ChargilyClient
+from src.chargily_pay.entity import Checkout
+from src.chargily_pay.idempotency import (
+    IdempotencyLayer,
+    MemoryIdempotencyStore,
+    SQLiteIdempotencyStore,
+    payload_key,
+)
+
+
+class FakeSession(requests.Session):
+    """Creates a new checkout id for every request"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def request(self, method, url, headers=None, timeout=None, **kwargs):
+        self.calls.append((method, url, kwargs.get("json")))
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps({"id": f"checkout-{len(self.calls)}"}).encode()
+        response.elapsed = datetime.timedelta(0)
+        return response
+
+
+class TestIdempotency(unittest.TestCase):
+    def test_payload_key_is_stable(self):
+        self.assertEqual(
+            payload_key({"amount": 1000, "currency": "dzd"}),
+            payload_key({"currency": "dzd", "amount": 1000}),
+        )
+        self.assertNotEqual(payload_key({"amount": 1000}), payload_key({"amount": 2000}))
+
+    def test_stores(self):
+        with tempfile.TemporaryDirectory() as directory:
+            sqlite_store = SQLiteIdempotencyStore(os.path.join(directory, "keys.db"))
+            for store in (MemoryIdempotencyStore(), sqlite_store):
+                self.assertIsNone(store.get("key"))
+                store.set("key", {"checkout_url": "url"}, ttl=60)
+                self.assertEqual(store.get("key"), {"checkout_url": "url"})
+                store.set("expired", {"checkout_url": "url"}, ttl=0)
+                self.assertIsNone(store.get("expired"))
+            sqlite_store.close()
+
+    def test_concurrent_calls_share_one_result(self):
+        layer = IdempotencyLayer()
+        calls = []
+
+        def create():
+            calls.append(1)
+            time.sleep(0.1)
+            return {"id": len(calls)}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(layer.run("key", create)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"id": 1}] * 5)
+        self.assertEqual(layer.run("key", create), {"id": 1})
+
+
+class TestCreateCheckout(unittest.TestCase):
+    def setUp(self):
+        self.session = FakeSession()
+        self.checkout = Checkout(
+            success_url="https://example.com", amount=1000, currency="dzd"
+        )
+
+    def test_keyless_calls_are_not_deduplicated_without_a_store(self):
+        client = ChargilyClient("key", "secret", session=self.session)
+        self.assertNotEqual(
+            client.create_checkout(self.checkout), client.create_checkout(self.checkout)
+        )
+        keyed = client.create_checkout(self.checkout, idempotency_key="cart-1")
+        self.assertEqual(
+            client.create_checkout(self.checkout, idempotency_key="cart-1"), keyed
+        )
+        self.assertNotEqual(client.create_checkout(self.checkout), keyed)
+        self.assertIsNone(client.idempotency)
+        self.assertEqual(len(self.session.calls), 4)
+
+    def test_store_deduplicates_identical_checkouts(self):
+        client = ChargilyClient(
+            "key",
+            "secret",
+            session=self.session,
+            idempotency_store=MemoryIdempotencyStore(),
+        )
+        first = client.create_checkout(self.checkout)
+        self.assertEqual(client.create_checkout(self.checkout), first)
+        self.assertEqual(len(self.session.calls), 1)
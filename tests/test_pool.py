@@ -0,0 +1,76 @@
+import datetime
+import itertools
+import json
+import unittest
+from unittest import mock
+
+import requests
+
+from src.chargily_pay.entity import Checkout
+from src.chargily_pay.idempotency import MemoryIdempotencyStore
+from src.chargily_pay.pool import ChargilyClientPool
+
+
+def fake_request(ids):
+    """Session.request answering with a new id every time"""
+
+    def request(session, method, url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps({"id": next(ids), "wallets": []}).encode()
+        response.elapsed = datetime.timedelta(0)
+        return response
+
+    return request
+
+
+class TestChargilyClientPool(unittest.TestCase):
+    def setUp(self):
+        credentials = {tenant: ("key", f"secret-{tenant}") for tenant in "abc"}
+        self.pool = ChargilyClientPool(
+            credentials,
+            max_tenants=2,
+            rate_limit=10,
+            idempotency_store=MemoryIdempotencyStore(),
+        )
+        self.addCleanup(self.pool.close)
+        patcher = mock.patch.object(
+            requests.Session, "request", fake_request(itertools.count())
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_clients_share_connections_but_not_cookies(self):
+        a, b = self.pool["a"], self.pool["b"]
+        self.assertIsNot(a.session, b.session)
+        self.assertIs(a.session.get_adapter(a.url), b.session.get_adapter(b.url))
+        a.session.cookies.set("session", "tenant-a")
+        self.assertEqual(len(b.session.cookies), 0)
+        self.assertEqual(a.headers["Authorization"], "Bearer secret-a")
+        self.assertEqual(b.headers["Authorization"], "Bearer secret-b")
+        self.assertIsNot(a.rate_limiter, b.rate_limiter)
+
+    def test_idempotency_keys_are_namespaced_per_tenant(self):
+        checkout = Checkout(
+            success_url="https://example.com", amount=1000, currency="dzd"
+        )
+        a = self.pool["a"].create_checkout(checkout)
+        self.assertEqual(self.pool["a"].create_checkout(checkout), a)
+        self.assertNotEqual(self.pool["b"].create_checkout(checkout), a)
+
+    def test_least_recently_used_tenant_is_evicted(self):
+        a = self.pool["a"]
+        self.pool["b"]
+        self.assertIs(self.pool["a"], a)
+        self.pool["c"]
+        self.assertEqual(len(self.pool), 2)
+        self.assertIn("a", self.pool)
+        self.assertNotIn("b", self.pool)
+
+    def test_evicted_client_stops_its_threads(self):
+        watcher = self.pool["a"].watch_balance(interval=60)
+        watcher.get(timeout=5)
+        thread = watcher._thread
+        self.pool.evict("a")
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
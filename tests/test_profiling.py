@@ -0,0 +1,139 @@
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import requests
+
+from src.chargily_pay.api import ChargilyClient
+from src.chargily_pay.profiling import (
+    Profiler,
+    current_trace,
+    load,
+    report,
+    span,
+    trace_files,
+)
+
+
+class FlakySession(requests.Session):
+    """The second request fails after a while, the others answer at once"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def request(self, method, url, headers=None, timeout=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            attempt = self.calls
+        if attempt == 2:
+            time.sleep(0.3)
+            raise requests.exceptions.ConnectionError("reset")
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps({"attempt": attempt}).encode()
+        response.elapsed = datetime.timedelta(0)
+        return response
+
+
+class StaticAdapter(requests.adapters.BaseAdapter):
+    """Transport adapter without a urllib3 pool manager"""
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b"{}"
+        response.elapsed = datetime.timedelta(0)
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "trace.log")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def trace_call(self, profiler, endpoint="checkouts"):
+        with profiler.trace() as trace:
+            if trace is not None:
+                trace.endpoint, trace.method, trace.status = endpoint, "GET", 200
+                with span("decode"):
+                    pass
+
+    def test_sampled_calls_are_written_and_reported(self):
+        profiler = Profiler(self.path, sample_rate=1.0)
+        for _ in range(3):
+            self.trace_call(profiler)
+        self.assertIsNone(current_trace())
+        profiler.close()
+
+        stats = load([self.path])
+        self.assertEqual(len(stats[("GET", "checkouts")]["total"]), 3)
+        self.assertIn("decode", stats[("GET", "checkouts")])
+        self.assertIn("GET checkouts (3 calls)", report(stats))
+
+    def test_unsampled_calls_are_not_traced(self):
+        profiler = Profiler(self.path, sample_rate=0.0)
+        self.trace_call(profiler)
+        profiler.close()
+        self.assertEqual(load([self.path]), {})
+
+    def test_rotated_files_oldest_first(self):
+        for name in ("trace.log.2", "trace.log.1", "trace.log.lock"):
+            open(os.path.join(self.directory.name, name), "w").close()
+        self.assertEqual(
+            [os.path.basename(p) for p in trace_files(self.path)],
+            ["trace.log.2", "trace.log.1", "trace.log"],
+        )
+
+
+class TestClientProfiling(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "trace.log")
+        self.profiler = Profiler(self.path, sample_rate=1.0)
+        self.addCleanup(self.profiler.close)
+
+    def test_calls_are_traced(self):
+        client = ChargilyClient(
+            "key", "secret", session=FlakySession(), profiler=self.profiler
+        )
+        client.retrieve_checkout("01hj")
+        stats = load([self.path])
+        self.assertEqual(set(stats), {("GET", "checkouts/{id}")})
+        self.assertIn("ttfb", stats[("GET", "checkouts/{id}")])
+
+    def test_adapters_without_a_pool_are_traced(self):
+        session = requests.Session()
+        session.mount("https://", StaticAdapter())
+        client = ChargilyClient(
+            "key", "secret", session=session, profiler=self.profiler
+        )
+        self.assertEqual(client.get_balance(), {})
+        record = load([self.path])[("GET", "balance")]
+        self.assertEqual(len(record["total"]), 1)
+
+    def test_hedge_wins_when_the_traced_attempt_fails(self):
+        client = ChargilyClient(
+            "key",
+            "secret",
+            session=FlakySession(),
+            profiler=self.profiler,
+            hedge_percentile=50,
+            hedge_min_samples=1,
+        )
+        client.get_balance()
+        self.assertEqual(client.get_balance(), {"attempt": 3})
+        self.assertEqual(len(load([self.path])[("GET", "balance")]["total"]), 2)
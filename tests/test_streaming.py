@@ -0,0 +1,49 @@
+import json
+import unittest
+
+from src.chargily_pay.streaming import PageStream
+
+PAGE = {
+    "livemode": False,
+    "current_page": 1,
+    "data": [
+        {
+            "id": "01hj",
+            "amount": 1000,
+            "description": 'quotes " and brackets ]}',
+            "n": None,
+        },
+        {"id": "01hk", "amount": 2500, "metadata": [{"key": "value"}], "paid": True},
+    ],
+    "last_page": 3,
+    "next_page_url": "https://pay.chargily.net/test/api/v2/checkouts?page=2",
+}
+
+
+def chunked(raw: bytes, size: int):
+    return [raw[i : i + size] for i in range(0, len(raw), size)]
+
+
+class TestPageStream(unittest.TestCase):
+    def test_items_are_decoded_across_chunks(self):
+        raw = json.dumps(PAGE, indent=2).encode("utf-8")
+        for size in (1, 3, 7, 64, len(raw)):
+            page = PageStream(chunked(raw, size))
+            self.assertEqual(list(page), PAGE["data"])
+            self.assertEqual(page.meta["last_page"], 3)
+            self.assertEqual(page.meta["next_page_url"], PAGE["next_page_url"])
+
+    def test_items_are_yielded_before_the_body_ends(self):
+        raw = json.dumps(PAGE).encode("utf-8")
+        first_item_end = raw.index(b'"n": null}') + len(b'"n": null}')
+        rest = raw[first_item_end:]
+        chunks = iter([raw[:first_item_end], rest])
+        page = iter(PageStream(chunks))
+        self.assertEqual(next(page), PAGE["data"][0])
+        # the rest of the body was not read yet
+        self.assertEqual(next(chunks), rest)
+
+    def test_empty_and_truncated_pages(self):
+        self.assertEqual(list(PageStream([b'{"data": []}'])), [])
+        with self.assertRaises(ValueError):
+            list(PageStream([b'{"data": [{"id": 1}, {"id"']))
@@ -0,0 +1,146 @@
+import datetime
+import json
+import threading
+import time
+import unittest
+
+import requests
+
+from src.chargily_pay.api import ChargilyClient, endpoint_name
+from src.chargily_pay.ratelimit import RateLimiter
+from src.chargily_pay.timeouts import Deadline, DeadlineExceeded, LatencyTracker
+
+
+class TestDeadline(unittest.TestCase):
+    def test_timeout_is_clamped_to_remaining_time(self):
+        deadline = Deadline(1)
+        self.assertLessEqual(deadline.timeout(30), 1)
+        self.assertEqual(deadline.timeout(0.5), 0.5)
+        connect, read = deadline.timeout((0.5, 30))
+        self.assertEqual(connect, 0.5)
+        self.assertLessEqual(read, 1)
+
+    def test_expired_deadline(self):
+        deadline = Deadline(0)
+        self.assertTrue(deadline.expired)
+        with self.assertRaises(DeadlineExceeded):
+            deadline.timeout(10)
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_percentile(self):
+        tracker = LatencyTracker(window=100)
+        self.assertIsNone(tracker.percentile("checkouts", 95))
+        for latency in range(1, 101):
+            tracker.observe("checkouts", latency / 100)
+        self.assertEqual(tracker.count("checkouts"), 100)
+        self.assertEqual(tracker.percentile("checkouts", 50), 0.51)
+        self.assertEqual(tracker.percentile("checkouts", 100), 1)
+
+    def test_endpoint_name(self):
+        self.assertEqual(endpoint_name("checkouts?page=2"), "checkouts")
+        self.assertEqual(endpoint_name("checkouts/01hj/items"), "checkouts/{id}/items")
+
+
+def make_response(status_code=200, body=None, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body if body is not None else {}).encode()
+    response.headers.update(headers or {})
+    response.elapsed = datetime.timedelta(0)
+    return response
+
+
+class FakeSession(requests.Session):
+    """Answers requests with `{"attempt": n}` after the delay of the attempt"""
+
+    def __init__(self, delays=()):
+        super().__init__()
+        self.delays = list(delays)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, headers=None, timeout=None, **kwargs):
+        with self._lock:
+            attempt = len(self.calls)
+            self.calls.append((method, url, timeout))
+        if attempt < len(self.delays):
+            time.sleep(self.delays[attempt])
+        return make_response(body={"attempt": attempt})
+
+
+class TestRequest(unittest.TestCase):
+    def test_default_and_call_timeout(self):
+        session = FakeSession()
+        client = ChargilyClient("key", "secret", session=session, timeout=(1, 2))
+        client.get_balance()
+        client.get_balance(timeout=7)
+        self.assertEqual([c[2] for c in session.calls], [(1, 2), 7])
+        self.assertTrue(session.calls[0][1].endswith("/balance"))
+
+    def test_deadline_clamps_every_request(self):
+        session = FakeSession()
+        client = ChargilyClient("key", "secret", session=session, timeout=(5, 30))
+        with client.deadline(0.5):
+            client.get_balance()
+            client.retrieve_checkout("01hj")
+        for _, _, (connect, read) in session.calls:
+            self.assertLessEqual(connect, 0.5)
+            self.assertLessEqual(read, 0.5)
+
+        with self.assertRaises(DeadlineExceeded):
+            with client.deadline(0):
+                client.get_balance()
+        self.assertEqual(len(session.calls), 2)
+
+    def test_slow_get_is_hedged(self):
+        session = FakeSession(delays=[0, 1])
+        client = ChargilyClient(
+            "key", "secret", session=session, hedge_percentile=50, hedge_min_samples=1
+        )
+        self.assertEqual(client.get_balance(), {"attempt": 0})
+
+        started = time.monotonic()
+        self.assertEqual(client.get_balance(), {"attempt": 2})
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(len(session.calls), 3)
+
+    def test_hedge_takes_a_rate_limit_token_without_waiting(self):
+        for burst, attempts in ((3, 3), (2, 2)):
+            session = FakeSession(delays=[0, 0.3])
+            client = ChargilyClient(
+                "key",
+                "secret",
+                session=session,
+                hedge_percentile=50,
+                hedge_min_samples=1,
+                rate_limiter=RateLimiter(0.001, burst=burst),
+            )
+            client.get_balance()
+            client.get_balance()
+            self.assertEqual(len(session.calls), attempts)
+            self.assertFalse(client.rate_limiter.try_acquire())
+
+    def test_fast_get_and_post_are_not_hedged(self):
+        session = FakeSession()
+        client = ChargilyClient(
+            "key", "secret", session=session, hedge_percentile=50, hedge_min_samples=1
+        )
+        client.latencies.observe("balance", 1)
+        client.get_balance()
+        client.expire_checkout("01hj")
+        self.assertEqual(len(session.calls), 2)
+
+    def test_hedge_after_close_is_sent_inline(self):
+        session = FakeSession()
+        client = ChargilyClient(
+            "key", "secret", session=session, hedge_percentile=50, hedge_min_samples=1
+        )
+        client.latencies.observe("balance", 1)
+        client.get_balance()
+        # closed by a pool eviction while another thread still uses it
+        executor = client._hedge_executor
+        client.close(wait=False)
+        client._hedge_executor = executor
+        self.assertEqual(client.get_balance(), {"attempt": 1})
+        self.assertEqual(client._hedges_in_flight, 0)
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.chargily_pay.api import ChargilyClient
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_HEAD(self):
+        with self.server.lock:
+            self.server.pings += 1
+        # keep the pings in flight at once, each on its own connection
+        time.sleep(0.05)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        body = b'{"wallets": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestWarmup(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.lock = threading.Lock()
+        self.server.connections = self.server.pings = 0
+        threading.Thread(
+            target=self.server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        url = f"http://127.0.0.1:{self.server.server_port}/api/v2/"
+        self.client = ChargilyClient("key", "secret", url=url)
+        self.addCleanup(self.client.close)
+
+    def test_warmup_opens_pooled_connections(self):
+        self.client.warmup(connections=3)
+        self.assertEqual(self.server.pings, 3)
+        self.assertEqual(self.server.connections, 3)
+        self.assertEqual(self.client._connections(self.client.url), 3)
+
+        self.assertEqual(self.client.get_balance(), {"wallets": []})
+        self.assertEqual(self.server.connections, 3)
+
+    def test_awarmup(self):
+        asyncio.run(self.client.awarmup(connections=2))
+        self.assertEqual(self.server.connections, 2)
+
+    def test_keepalive_pings_until_stopped(self):
+        self.client.warmup(connections=1, keepalive_interval=0.05)
+        time.sleep(0.4)
+        self.client.stop_keepalive()
+        time.sleep(0.1)
+        pings = self.server.pings
+        self.assertGreater(pings, 2)
+        # still on the connection opened by the warmup
+        self.assertEqual(self.server.connections, 1)
+        time.sleep(0.2)
+        self.assertEqual(self.server.pings, pings)
@@ -0,0 +1,108 @@
+import asyncio
+import datetime
+import json
+import threading
+import unittest
+
+import requests
+
+from src.chargily_pay.api import ChargilyClient
+
+
+def balance(dzd, usd=0):
+    return {
+        "wallets": [
+            {"currency": "dzd", "balance": dzd},
+            {"currency": "usd", "balance": usd},
+        ]
+    }
+
+
+class FakeBalanceAPI:
+    """Serves `balance` with an ETag, 304 when If-None-Match matches it"""
+
+    def __init__(self, value):
+        self.value = value
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def __call__(self, method, path, headers=None, **kwargs):
+        with self._lock:
+            self.requests.append((method, path, dict(headers or {})))
+            body = json.dumps(self.value).encode()
+        etag = f'"{hash(body)}"'
+        response = requests.Response()
+        response.elapsed = datetime.timedelta(0)
+        if (headers or {}).get("If-None-Match") == etag:
+            response.status_code = 304
+            return response
+        response.status_code = 200
+        response._content = body
+        response.headers["ETag"] = etag
+        return response
+
+
+class TestBalanceWatcher(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeBalanceAPI(balance(1000))
+        self.client = ChargilyClient("key", "secret")
+        self.client._request = self.api
+        self.addCleanup(self.client.close)
+        # polls are made by hand, the background thread polls only once
+        self.watcher = self.client.watch_balance(interval=60)
+
+    def test_etag_is_sent_and_304_keeps_the_balance(self):
+        self.assertEqual(self.watcher.get(timeout=5), balance(1000))
+        self.watcher.poll()
+        self.assertNotIn("If-None-Match", self.api.requests[0][2])
+        self.assertIn("If-None-Match", self.api.requests[1][2])
+        self.assertEqual(self.watcher.get(), balance(1000))
+
+    def test_subscribers_are_called_on_changes_only(self):
+        self.watcher.get(timeout=5)
+        changes = []
+        self.watcher.subscribe(lambda *args: changes.append(args))
+        self.watcher.poll()
+        self.assertEqual(changes, [])
+
+        self.api.value = balance(1500)
+        self.watcher.poll()
+        self.assertEqual(
+            changes,
+            [
+                (
+                    "dzd",
+                    {"currency": "dzd", "balance": 1500},
+                    {"currency": "dzd", "balance": 1000},
+                )
+            ],
+        )
+
+    def test_coroutine_subscribers_run_on_their_loop(self):
+        self.watcher.get(timeout=5)
+
+        async def main():
+            received = asyncio.Queue()
+            loop = asyncio.get_running_loop()
+
+            async def on_change(currency, wallet, previous):
+                self.assertIs(asyncio.get_running_loop(), loop)
+                await received.put(wallet["balance"])
+
+            self.watcher.subscribe(on_change)
+            self.api.value = balance(2000)
+            await asyncio.to_thread(self.watcher.poll)
+            return await asyncio.wait_for(received.get(), 5)
+
+        self.assertEqual(asyncio.run(main()), 2000)
+
+    def test_polling_restarts_after_stop(self):
+        self.watcher.get(timeout=5)
+        self.watcher.stop()
+        self.api.value = balance(3000)
+        self.assertIs(self.client.watch_balance(), self.watcher)
+        self.assertEqual(self.watcher.get(timeout=5), balance(3000))
+
+    def test_interval_of_the_shared_watcher_can_change(self):
+        self.assertEqual(self.client.watch_balance(interval=10).interval, 10)
+        self.assertEqual(self.client.watch_balance().interval, 10)
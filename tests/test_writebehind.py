@@ -0,0 +1,190 @@
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import requests
+
+from src.chargily_pay.writebehind import WriteBehindQueue
+
+
+def make_response(status_code=200, body=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body if body is not None else {}).encode()
+    response.elapsed = datetime.timedelta(0)
+    return response
+
+
+class FakeClient:
+    """Records the update requests, failing the first `failures` of them (all
+    by default) with `error` when set. Requests wait for `gate` when given."""
+
+    def __init__(self, error=None, failures=None, gate=None):
+        self.error = error
+        self.failures = failures
+        self.gate = gate
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def _request(self, method, path, **kwargs):
+        if self.gate is not None:
+            self.gate.wait(5)
+        with self._lock:
+            self.requests.append((method, path, dict(kwargs["json"])))
+            failing = self.failures is None or len(self.requests) <= self.failures
+        if self.error is not None and failing:
+            raise self.error
+        return make_response(body={"path": path, **kwargs["json"]})
+
+
+class TestWriteBehindQueue(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.journal_path = os.path.join(directory.name, "writes.jsonl")
+
+    def read_journal(self):
+        with open(self.journal_path, encoding="utf-8") as journal:
+            return [json.loads(line) for line in journal]
+
+    def test_updates_of_one_entity_are_merged(self):
+        client = FakeClient()
+        with WriteBehindQueue(client, flush_interval=60) as queue:
+            first = queue.update_price("p1", [{"stock": 10}])
+            second = queue.update_price("p1", [{"stock": 9}])
+            other = queue.update_price("p2", [{"stock": 1}])
+            queue.flush().result(5)
+
+        self.assertEqual(
+            sorted(client.requests),
+            [
+                ("POST", "prices/p1", {"metadata": [{"stock": 9}]}),
+                ("POST", "prices/p2", {"metadata": [{"stock": 1}]}),
+            ],
+        )
+        merged = {"path": "prices/p1", "metadata": [{"stock": 9}]}
+        self.assertEqual(first.result(), merged)
+        self.assertEqual(second.result(), merged)
+        self.assertEqual(other.result()["path"], "prices/p2")
+
+    def test_flush_resolves_after_every_ack(self):
+        error = requests.exceptions.HTTPError(response=make_response(422))
+        client = FakeClient(error=error)
+        queue = WriteBehindQueue(client, flush_interval=60)
+        update = queue.update_price("p1", [])
+        self.assertIsNone(queue.flush().result(5))
+        self.assertTrue(update.done())
+        self.assertIsInstance(update.exception(), requests.exceptions.HTTPError)
+        queue.close()
+        with self.assertRaises(RuntimeError):
+            queue.update_price("p1", [])
+
+    def test_journal_is_replayed_after_a_crash(self):
+        # the first queue never flushes, as if the process died
+        WriteBehindQueue(
+            FakeClient(), flush_interval=60, journal_path=self.journal_path
+        )
+        crashed = WriteBehindQueue(
+            FakeClient(), flush_interval=60, journal_path=self.journal_path
+        )
+        crashed.update_price("p1", [{"stock": 10}])
+        crashed.update_price("p1", [{"stock": 9}])
+        self.assertEqual([r["op"] for r in self.read_journal()], ["put", "put"])
+
+        client = FakeClient()
+        with WriteBehindQueue(client, journal_path=self.journal_path) as queue:
+            queue.flush().result(5)
+        self.assertEqual(
+            client.requests, [("POST", "prices/p1", {"metadata": [{"stock": 9}]})]
+        )
+        self.assertEqual(self.read_journal(), [])
+
+    def test_torn_line_is_ignored(self):
+        put = {"op": "put", "seq": 1, "resource": "price", "id": "p1"}
+        with open(self.journal_path, "w", encoding="utf-8") as journal:
+            journal.write(json.dumps({**put, "payload": {"metadata": []}}) + "\n")
+            journal.write('{"op": "put", "seq": 2, "reso')
+
+        client = FakeClient()
+        with WriteBehindQueue(client, journal_path=self.journal_path) as queue:
+            queue.flush().result(5)
+        self.assertEqual(client.requests, [("POST", "prices/p1", {"metadata": []})])
+
+    def test_flush_waits_for_writes_in_flight(self):
+        gate = threading.Event()
+        queue = WriteBehindQueue(FakeClient(gate=gate), flush_interval=60)
+        update = queue.update_price("p1", [])
+        first = queue.flush()
+        time.sleep(0.1)
+        self.assertFalse(queue.flush().done())
+        gate.set()
+        first.result(5)
+        self.assertTrue(update.done())
+        queue.close()
+
+    def test_transient_failure_is_retried(self):
+        error = requests.exceptions.ConnectionError()
+        client = FakeClient(error=error, failures=2)
+        queue = WriteBehindQueue(
+            client,
+            flush_interval=60,
+            journal_path=self.journal_path,
+            retry_backoff=0.01,
+        )
+        update = queue.update_price("p1", [{"stock": 10}])
+        queue.flush().result(5)
+        self.assertEqual(update.result()["metadata"], [{"stock": 10}])
+        self.assertEqual(len(client.requests), 3)
+        queue.close()
+        self.assertEqual(self.read_journal(), [])
+
+    def test_retry_is_merged_under_newer_updates(self):
+        gate = threading.Event()
+        error = requests.exceptions.ConnectionError()
+        client = FakeClient(error=error, failures=1, gate=gate)
+        with WriteBehindQueue(
+            client,
+            flush_interval=60,
+            journal_path=self.journal_path,
+            retry_backoff=0.01,
+        ) as queue:
+            older = queue.update_price("p1", [{"stock": 10}])
+            queue.flush()
+            time.sleep(0.1)
+            # queued while the first attempt is in flight
+            newer = queue.update_price("p1", [{"stock": 9}])
+            gate.set()
+            queue.flush().result(5)
+
+        self.assertEqual(client.requests[-1][2], {"metadata": [{"stock": 9}]})
+        self.assertEqual(older.result(), newer.result())
+        self.assertEqual(self.read_journal(), [])
+
+        client = FakeClient()
+        WriteBehindQueue(client, journal_path=self.journal_path).close()
+        self.assertEqual(client.requests, [])
+
+    def test_failures_left_at_close_stay_in_the_journal(self):
+        client = FakeClient(error=requests.exceptions.ConnectionError())
+        queue = WriteBehindQueue(
+            client, flush_interval=60, journal_path=self.journal_path, retry_backoff=60
+        )
+        update = queue.update_price("p1", [{"stock": 10}])
+        queue.flush()
+        time.sleep(0.1)
+        queue.close(timeout=5)
+        self.assertIsInstance(update.exception(), requests.exceptions.ConnectionError)
+        self.assertEqual([r["seq"] for r in self.read_journal()], [1])
+
+        client = FakeClient()
+        with WriteBehindQueue(client, journal_path=self.journal_path) as queue:
+            queue.flush().result(5)
+        self.assertEqual(
+            client.requests, [("POST", "prices/p1", {"metadata": [{"stock": 10}]})]
+        )
+        self.assertEqual(self.read_journal(), [])
+        self.assertFalse(os.path.exists(self.journal_path + ".tmp"))